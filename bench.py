@@ -0,0 +1,256 @@
+"""Benchmarks for the roll engine, die rendering and widget handling.
+
+Run with:
+    python -m bench                       run everything and print a table
+    python -m bench -k engine             only benchmarks whose name contains "engine"
+    python -m bench --json out.json       also save the results as JSON
+    python -m bench --compare old.json    show the speedup against saved results
+
+Each benchmark is timed several times and the best run is reported, as
+the number of units (rolls, dice, draws...) handled per second. Benchmarks
+that need a display are reported as skipped when Tk cannot open a window.
+"""
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+
+import engine
+import notation
+
+BENCHMARKS = []
+
+
+def benchmark(name, units):
+    """Register a benchmark. The decorated function sets up the fixture
+    and returns (run, count, teardown): run() does count units of work and
+    teardown() (or None) releases the fixture"""
+    def register(setup):
+        BENCHMARKS.append((name, units, setup))
+        return setup
+    return register
+
+
+def _gui():
+    # Import the GUI modules, which need a display
+    import graphics
+    import die
+    import buttons
+    return graphics, die, buttons
+
+
+@benchmark("engine.roll 5d6", "dice")
+def _engine_roll():
+    return (lambda: engine.roll(5, 6)), 5, None
+
+
+@benchmark("engine.roll_totals 1000x5d6", "dice")
+def _engine_roll_totals():
+    return (lambda: engine.roll_totals(1000, 5, 6)), 5000, None
+
+
+@benchmark("engine.roll_totals_array 100000x5d6", "dice")
+def _engine_roll_totals_array():
+    engine.roll_totals_array(1, 5, 6)  # fail early if NumPy is missing
+    return (lambda: engine.roll_totals_array(100000, 5, 6)), 500000, None
+
+
+@benchmark("fairness.update 65536x5d6", "rolls")
+def _fairness_update():
+    import fairness
+    test = fairness.FairnessTest(5, 6)
+    chunk = engine.roll_array(65536, 5, 6)
+    return (lambda: test.update(chunk)), len(chunk), None
+
+
+@benchmark("notation.roll 4d6kh3+2", "rolls")
+def _notation_roll():
+    plan = notation.parse("4d6kh3+2")
+    return plan.roll, 1, None
+
+
+@benchmark("DieView.setValue", "calls")
+def _die_set_value():
+    graphics, die, buttons = _gui()
+    win = graphics.GraphWin("bench", 200, 200)
+    win.setCoords(0, 0, 10, 10)
+    view = die.DieView(win, graphics.Point(5, 5), 4)
+    values = iter(range(10 ** 9))
+    return (lambda: view.setValue(next(values) % 6 + 1)), 1, win.close
+
+
+def _draw_undraw(n):
+    # draw and undraw every one of n rectangles in a window holding them all
+    graphics, die, buttons = _gui()
+    win = graphics.GraphWin("bench", 200, 200, autoflush=False)
+    win.setCoords(0, 0, n, n)
+    items = [graphics.Rectangle(graphics.Point(i, i), graphics.Point(i + 1, i + 1))
+             for i in range(n)]
+    for item in items:
+        item.draw(win)
+
+    def run():
+        for item in items:
+            item.undraw()
+            item.draw(win)
+    return run, 2 * n, win.close
+
+
+@benchmark("draw+undraw with 100 items", "ops")
+def _draw_undraw_100():
+    return _draw_undraw(100)
+
+
+@benchmark("draw+undraw with 2000 items", "ops")
+def _draw_undraw_2000():
+    return _draw_undraw(2000)
+
+
+@benchmark("Dropdown open+close 20 options", "cycles")
+def _dropdown_toggle():
+    graphics, die, buttons = _gui()
+    win = graphics.GraphWin("bench", 600, 450)
+    win.setCoords(0, 0, 10, 10)
+    dropdown = buttons.Dropdown(win, graphics.Point(5, 9), 2, 0.3,
+                                [str(i) for i in range(1, 21)], "Sides")
+
+    def run():
+        dropdown.toggle_options()
+        dropdown.toggle_options()
+    return run, 1, win.close
+
+
+@benchmark("Image.putPixels 256x256 frame", "frames")
+def _image_put_pixels():
+    graphics, die, buttons = _gui()
+    image = graphics.Image(graphics.Point(0, 0), 256, 256)
+    frames = [bytes([shade, 0, 255 - shade]) * (256 * 256) for shade in (0, 128, 255)]
+    index = iter(range(10 ** 9))
+    return (lambda: image.putPixels(frames[next(index) % 3])), 1, None
+
+
+@benchmark("click dispatch with 400 regions", "clicks")
+def _click_dispatch():
+    graphics, die, buttons = _gui()
+    win = graphics.GraphWin("bench", 600, 450)
+    win.setCoords(0, 0, 20, 20)
+    for i in range(400):
+        x, y = i % 20, i // 20
+        win.addClickRegion(x, y, x + 0.9, y + 0.9, lambda p: None)
+    points = [graphics.Point(i % 20 + 0.5, (7 * i) % 20 + 0.5) for i in range(64)]
+
+    def run():
+        for p in points:
+            win.regionAt(p)
+    return run, len(points), win.close
+
+
+@benchmark("click dispatch to buttons, no setCoords", "clicks")
+def _click_dispatch_pixels():
+    # Without setCoords region bounds are floats, as Buttons make them
+    graphics, die, buttons = _gui()
+    win = graphics.GraphWin("bench", 600, 450)
+    for i in range(100):
+        x, y = 30 * (i % 20) + 15, 30 * (i // 20) + 15
+        button = buttons.Button(win, graphics.Point(x, y), 25, 25, "", lambda: None)
+        button.activate()
+    points = [graphics.Point(30 * (i % 20) + 15.5, 30 * (i % 5) + 14.5) for i in range(64)]
+
+    def run():
+        for p in points:
+            win.regionAt(p)
+    return run, len(points), win.close
+
+
+def _time(run, repeat, min_time):
+    # Best seconds per call of run(), calibrating the loop count first
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed) + 1)
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def run_benchmarks(pattern="", repeat=5, min_time=0.2):
+    """Run every registered benchmark whose name contains pattern and
+    return a list of result dicts"""
+    results = []
+    for name, units, setup in BENCHMARKS:
+        if pattern not in name:
+            continue
+        result = {"name": name, "units": units}
+        try:
+            run, count, teardown = setup()
+        except Exception as error:
+            result["skipped"] = "{}: {}".format(type(error).__name__, error)
+            results.append(result)
+            continue
+        try:
+            seconds = _time(run, repeat, min_time)
+        finally:
+            if teardown:
+                teardown()
+        result["seconds_per_call"] = seconds
+        result["per_second"] = count / seconds
+        results.append(result)
+    return results
+
+
+def _commit():
+    # Current git commit, if this is a git checkout
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="pattern", default="", help="only run matching benchmarks")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2,
+                        help="minimum seconds per timed run")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--compare", help="compare against a previous --json file")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.pattern, args.repeat, args.min_time)
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {r["name"]: r for r in json.load(f)["results"]}
+
+    for result in results:
+        if "skipped" in result:
+            print("{:<40} skipped ({})".format(result["name"], result["skipped"]))
+            continue
+        line = "{:<40} {:>14,.0f} {}/s".format(result["name"], result["per_second"], result["units"])
+        old = baseline.get(result["name"], {}).get("per_second")
+        if old:
+            line += "  x{:.2f}".format(result["per_second"] / old)
+        print(line)
+
+    if args.json:
+        report = {"commit": _commit(), "python": platform.python_version(),
+                  "platform": platform.platform(), "results": results}
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
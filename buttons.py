@@ -1,18 +1,26 @@
 from graphics import *
-import time
+
+# How long a clicked button shows its pressed colour, in milliseconds
+FEEDBACK_MS = 100
 
 
 class Button:
-    """activated() and deactivated() and clicked(p) is a method that returns if the user pressed within the required area"""
+    """activated() and deactivated() and clicked(p) is a method that returns if the user pressed within the required area.
+
+    Each button registers a click region with its window, which holds the
+    button's bounds. If the button has a command, the window calls it
+    when the active button is clicked, and clicked(p) only reports whether
+    that happened."""
 
-    def __init__(self, win, center, width, height, label):
-        """Create modern button with rounded corners"""
+    def __init__(self, win, center, width, height, label, command=None):
+        """Create modern button with rounded corners. command, if given,
+        is called with no arguments when the active button is clicked"""
         self.win = win
         w, h = width / 2.0, height / 2.0
         x, y = center.getX(), center.getY()
 
-        self.xmax, self.xmin = x + w, x - w
-        self.ymax, self.ymin = y + h, y - h
+        self.command = command
+        self.region = win.addClickRegion(x - w, y - h, x + w, y + h, self._press)
 
         p1 = Point(self.xmin, self.ymin)
         p2 = Point(self.xmax, self.ymax)
@@ -35,23 +43,53 @@ class Button:
         self.label.setSize(12)
         self.label.setStyle("bold")
         self.label.draw(win)
+        self._feedback = None   # pending Tk timer that ends click feedback
         self.deactivate()
 
+    # The bounds live in the click region so the two cannot disagree
+    xmin = property(lambda self: self.region.xmin)
+    xmax = property(lambda self: self.region.xmax)
+    ymin = property(lambda self: self.region.ymin)
+    ymax = property(lambda self: self.region.ymax)
+
     def clicked(self, p):
-        """return true if active and inside p"""
-        result = (
-            self.active
-            and self.xmin <= p.getX() <= self.xmax
-            and self.ymin <= p.getY() <= self.ymax
-        )
-        # Visual feedback on click
+        """return true if active and inside p. With a command, the window
+        has already run it, so this just says whether the click hit"""
+        if self.command is not None:
+            return self.win.handledBy(p) is self.region
+        result = self.active and self.region.contains(p.getX(), p.getY())
         if result:
-            self.rect.setFill(self.hover_fill)
-            self.win.update()
-            time.sleep(0.1)
-            self.rect.setFill(self.active_fill)
+            self._startFeedback()
         return result
 
+    def setCommand(self, command):
+        """Set the function called when the active button is clicked"""
+        self.command = command
+        self.region.setEnabled(self.active and command is not None)
+
+    def move(self, dx, dy):
+        """Move the button, and where it can be clicked, by dx, dy"""
+        self.rect.move(dx, dy)
+        self.label.move(dx, dy)
+        self.region.move(dx, dy)
+
+    def _press(self, p):
+        """click handler for the button's region"""
+        self._startFeedback()
+        self.command()
+
+    def _startFeedback(self):
+        """visual feedback on click, ended by a timer so we return at once"""
+        self.rect.setFill(self.hover_fill)
+        if self._feedback is not None:
+            self.win.after_cancel(self._feedback)
+        self._feedback = self.win.after(FEEDBACK_MS, self._endFeedback)
+
+    def _endFeedback(self):
+        """restores the fill after click feedback"""
+        self._feedback = None
+        self.rect.setFill(self.active_fill if self.active else self.inactive_fill)
+
     def getLabel(self):
         """label of the string"""
         return self.label.getText()
@@ -63,6 +101,7 @@ class Button:
         self.rect.setWidth(1)
         self.rect.setOutline("#2980B9")  # Dark border
         self.active = True
+        self.region.setEnabled(self.command is not None)
 
     def deactivate(self):
         """sets button to unactive"""
@@ -71,10 +110,17 @@ class Button:
         self.rect.setWidth(1)
         self.rect.setOutline("#BBBBBB")  # Light border
         self.active = False
+        self.region.setEnabled(False)
 
 
 class Dropdown:
-    """A modern dropdown menu that allows selection from a list of options"""
+    """A modern dropdown menu that allows selection from a list of options.
+
+    The option rows are drawn once, the first time the menu opens, and
+    share a Tk tag. Opening and closing the menu just raises and shows or
+    hides that tag, and a click is mapped to an option row arithmetically.
+    The main button and the open menu handle their own clicks through
+    click regions on the window; clicked(p) only reports them."""
     
     def __init__(self, win, center, width, height, options, label=""):
         """Create a dropdown with options
@@ -89,7 +135,6 @@ class Dropdown:
         self.options = options
         self.current_option = options[0]
         self.is_open = False
-        self.option_buttons = []
         self.label_text = label
         
         # Modern color theme
@@ -100,7 +145,8 @@ class Dropdown:
         self.option_bg_hover = "#E9ECEF"  # Light gray hover
         
         # Create the main dropdown button
-        self.main_button = Button(win, center, width, height, f"{label}: {self.current_option}")
+        self.main_button = Button(win, center, width, height, f"{label}: {self.current_option}",
+                                  self.toggle_options)
         self.main_button.activate()
         
         # Add dropdown arrow indicator
@@ -116,113 +162,114 @@ class Dropdown:
         self.height = height
         self.center = center
         
-        # Save dimensions for the option buttons that will appear when clicked
+        # The option rows hang below the main button, the first one
+        # starting a row below the top of the button
         self.option_ymin = center.getY() + height/2.0
+        self.options_top = self.option_ymin - height
+
+        # Clicks on the open menu, which sits above other widgets
+        bottom = self.options_top - len(options) * height
+        self.menu_region = win.addClickRegion(self.xmin, bottom, self.xmax, self.options_top,
+                                              self._pick, layer=1)
+        self.menu_region.setEnabled(False)
+
+        # Option widgets, created on first open and then only shown or hidden
+        self.tag = "dropdown{}".format(id(self))
+        self.options_container = None
+        self.option_rects = []
+        self.option_labels = []
         
     def clicked(self, p):
-        """Check if dropdown is clicked and handle the action"""
-        # Check if main dropdown button is clicked
-        if self.main_button.clicked(p):
-            self.toggle_options()
-            return True
-            
-        # If dropdown is open, check if any option is clicked
-        if self.is_open:
-            for i, button in enumerate(self.option_buttons):
-                if button.clicked(p):
-                    self.select_option(i)
-                    return True
-                    
-        return False
+        """Return True if the click at p, as from getMouse, hit the main
+        button or an option. The window has already opened, closed or
+        picked for it through the click regions"""
+        return self.win.handledBy(p) in (self.main_button.region, self.menu_region)
+
+    # The dropdown's bounds are those of its main button
+    xmin = property(lambda self: self.main_button.xmin)
+    xmax = property(lambda self: self.main_button.xmax)
+    ymin = property(lambda self: self.main_button.ymin)
+    ymax = property(lambda self: self.main_button.ymax)
+
+    def _pick(self, p):
+        """click handler for the open menu"""
+        index = self.option_at(p)
+        if index is not None:
+            self.select_option(index)
+
+    def option_at(self, p):
+        """Return the index of the option row containing p, or None"""
+        if not self.xmin <= p.getX() <= self.xmax:
+            return None
+        row = int((self.options_top - p.getY()) // self.height)
+        if 0 <= row < len(self.options):
+            return row
+        return None
         
     def toggle_options(self):
         """Toggle showing/hiding the dropdown options"""
         if self.is_open:
             self.close_options()
-            self.arrow.setText("▼")  # Down arrow when closed
         else:
             self.open_options()
-            self.arrow.setText("▲")  # Up arrow when open
+
+    def _build_options(self):
+        # Create the container and one row per option, hidden
+        bottom = self.options_top - len(self.options) * self.height
+        with self.win.batch():
+            container = Rectangle(Point(self.xmin, self.options_top), Point(self.xmax, bottom))
+            container.setFill(self.option_bg)
+            container.setOutline(self.dropdown_border)
+            container.setTag(self.tag)
+            container.draw(self.win)
+            self.options_container = container
+
+            for i, option in enumerate(self.options):
+                center_y = self.options_top - (i + 0.5) * self.height
+                rect = Rectangle(Point(self.xmin, center_y - self.height/2),
+                                 Point(self.xmax, center_y + self.height/2))
+                rect.setFill(self.option_bg)
+                rect.setOutline(self.option_bg)
+                rect.setTag(self.tag)
+                rect.draw(self.win)
+
+                label = Text(Point(self.center.getX(), center_y), option)
+                label.setTextColor(self.dropdown_text)
+                label.setSize(10)
+                label.setTag(self.tag)
+                label.draw(self.win)
+
+                self.option_rects.append(rect)
+                self.option_labels.append(label)
+            self.win.setTagVisible(self.tag, False)
     
     def open_options(self):
         """Display dropdown options"""
+        if self.options_container is None:
+            self._build_options()
         self.is_open = True
-        self.option_buttons = []
-        self.option_rects = []
-        self.option_labels = []
-        
-        # Container for options (background)
-        container_p1 = Point(self.center.getX() - self.width/2, self.option_ymin)
-        container_p2 = Point(self.center.getX() + self.width/2, 
-                            self.option_ymin - (len(self.options) * self.height))
-        container = Rectangle(container_p1, container_p2)
-        container.setFill(self.option_bg)
-        container.setOutline(self.dropdown_border)
-        container.draw(self.win)
-        self.options_container = container
-        
-        # Create a button for each option
-        for i, option in enumerate(self.options):
-            # Position each option below the dropdown button
-            option_center = Point(
-                self.center.getX(), 
-                self.option_ymin - ((i + 1) * self.height) - (self.height / 2)
-            )
-            
-            # Create a simple button for each option
-            p1 = Point(option_center.getX() - self.width/2, 
-                      option_center.getY() - self.height/2)
-            p2 = Point(option_center.getX() + self.width/2, 
-                      option_center.getY() + self.height/2)
-            
-            rect = Rectangle(p1, p2)
-            rect.setFill(self.option_bg)
-            rect.setOutline(self.option_bg)
-            rect.draw(self.win)
-            
-            label = Text(option_center, option)
-            label.setTextColor(self.dropdown_text)
-            label.setSize(10)
-            label.draw(self.win)
-            
-            # Use the Button class for click handling
-            button = Button(self.win, option_center, self.width, self.height, option)
-            button.rect.undraw()     # Hide default button appearance
-            button.label.undraw()    # Hide default label
-            button.activate()        # Make it clickable
-            
-            self.option_buttons.append(button)
-            self.option_rects.append(rect)
-            self.option_labels.append(label)
+        self.menu_region.setEnabled(True)
+        with self.win.batch():
+            self.win.raiseTag(self.tag)
+            self.win.setTagVisible(self.tag, True)
+            self.arrow.setText("▲")  # Up arrow when open
     
     def close_options(self):
         """Hide dropdown options"""
         self.is_open = False
-        # Remove the container
-        if hasattr(self, 'options_container'):
-            self.options_container.undraw()
-        
-        # Remove all option components
-        for button in self.option_buttons:
-            button.rect.undraw()
-            button.label.undraw()
-            
-        for rect in self.option_rects:
-            rect.undraw()
-            
-        for label in self.option_labels:
-            label.undraw()
-            
-        self.option_buttons = []
-        self.option_rects = []
-        self.option_labels = []
+        self.menu_region.setEnabled(False)
+        with self.win.batch():
+            if self.options_container is not None:
+                self.win.setTagVisible(self.tag, False)
+            self.arrow.setText("▼")  # Down arrow when closed
     
     def select_option(self, index):
         """Select an option from the dropdown"""
         self.current_option = self.options[index]
-        # Update the main button text with the correct label
-        self.main_button.label.setText(f"{self.label_text}: {self.current_option}")
-        self.close_options()
+        with self.win.batch():
+            # Update the main button text with the correct label
+            self.main_button.label.setText(f"{self.label_text}: {self.current_option}")
+            self.close_options()
     
     def get_value(self):
         """Return the current selected value as an integer"""
@@ -1,11 +1,102 @@
 from graphics import *
 
+# 3x5 bitmaps of the characters drawn on sprite faces
+GLYPHS = {
+    "0": ("111", "101", "101", "101", "111"),
+    "1": ("010", "110", "010", "010", "111"),
+    "2": ("111", "001", "111", "100", "111"),
+    "3": ("111", "001", "111", "001", "111"),
+    "4": ("101", "101", "111", "001", "001"),
+    "5": ("111", "100", "111", "001", "111"),
+    "6": ("111", "100", "111", "101", "111"),
+    "7": ("111", "001", "001", "001", "001"),
+    "8": ("111", "101", "111", "101", "111"),
+    "9": ("111", "101", "111", "001", "111"),
+    "-": ("000", "000", "111", "000", "000"),
+}
+
+# Pip centres for pips 1-7, in units of the pip offset from the centre
+PIP_OFFSETS = [(-1, -1), (-1, 0), (-1, 1), (0, 0), (1, -1), (1, 0), (1, 1)]
+
+# Face images shared by all sprite-mode dice, keyed by
+# (pixel size, shadow depth, value, colors)
+SPRITES = ImageCache(512)
+
+
+def renderFace(pixels, shadow, value, colors, headless=None):
+    """Render a die face pixels wide, with a shadow shadow pixels deep,
+    into a new Image. colors is (background, border, foreground, shadow);
+    headless is passed on to Image"""
+    background, border, foreground, shadow_color = colors
+    image = Image(Point(0, 0), pixels + shadow, pixels + shadow, headless=headless)
+    if shadow:
+        image.fillRect(shadow, shadow, pixels + shadow, pixels + shadow, shadow_color)
+
+    # face with a 2 pixel border
+    edge = 2
+    rows = []
+    for y in range(pixels):
+        if y < edge or y >= pixels - edge:
+            rows.append([border] * pixels)
+        else:
+            rows.append([border] * edge + [background] * (pixels - 2 * edge) + [border] * edge)
+
+    def fill(x1, y1, x2, y2):
+        for y in range(max(y1, 0), min(y2, pixels)):
+            rows[y][max(x1, 0):min(x2, pixels)] = [foreground] * (min(x2, pixels) - max(x1, 0))
+
+    lit = DieView.PIP_MASKS.get(value, 0)
+    if lit:
+        # same proportions as the Circle pips
+        radius = 0.1 * pixels
+        offset = 0.3 * pixels
+        for i, (dx, dy) in enumerate(PIP_OFFSETS):
+            if lit >> i & 1:
+                px = pixels / 2.0 + dx * offset
+                py = pixels / 2.0 - dy * offset
+                for y in range(int(py - radius), int(py + radius) + 1):
+                    for x in range(int(px - radius), int(px + radius) + 1):
+                        if (x + 0.5 - px) ** 2 + (y + 0.5 - py) ** 2 <= radius ** 2:
+                            fill(x, y, x + 1, y + 1)
+    else:
+        # the number, scaled to about half the face
+        text = str(value)
+        cols = 4 * len(text) - 1
+        cell = max(1, min(int(pixels * 0.5 / cols), int(pixels * 0.4 / 5)))
+        x0 = (pixels - cols * cell) // 2
+        y0 = (pixels - 5 * cell) // 2
+        for k, char in enumerate(text):
+            for r, line in enumerate(GLYPHS.get(char, GLYPHS["-"])):
+                for c, bit in enumerate(line):
+                    if bit == "1":
+                        x = x0 + (4 * k + c) * cell
+                        y = y0 + r * cell
+                        fill(x, y, x + cell, y + cell)
+
+    image.setPixels(rows)
+    return image
+
+
 class DieView:
     # shows graphical representation of a multi-sided dice with modern styling
-    def __init__(self, win, center, size):
-        # create a modern view of the die
+
+    # pips lit for faces 1-6; bit i is set when pip i+1 is lit
+    PIP_MASKS = {
+        1: 0b0001000,
+        2: 0b1000001,
+        3: 0b1001001,
+        4: 0b1010101,
+        5: 0b1011101,
+        6: 0b1110111,
+    }
+
+    def __init__(self, win, center, size, sprite=False):
+        # create a modern view of the die. With sprite=True the die is a
+        # single canvas image whose faces are rendered once and cached.
         self.win = win
         self.is_hidden = False    # Flag to track visibility
+        self.sprite = None
+        self.value = None         # value currently displayed
         
         # Modern color scheme
         self.background = "#FFFFFF"     # White face
@@ -18,6 +109,11 @@ class DieView:
         hsize = size / 2.0             # half size of die
         offset = 0.6 * hsize           # distance from center to other pips
         cx, cy = center.getX(), center.getY()
+        shadow_offset = 0.05 * size
+
+        if sprite:
+            self.__makeSprite(cx, cy, hsize, shadow_offset)
+            return
         
         # Create rounded rectangle for die face
         p1 = Point(cx - hsize, cy - hsize)
@@ -29,7 +125,6 @@ class DieView:
         self.rect.draw(win)
         
         # Create underlying shadow for 3D effect
-        shadow_offset = 0.05 * size
         p1s = Point(cx - hsize + shadow_offset, cy - hsize - shadow_offset)
         p2s = Point(cx + hsize + shadow_offset, cy + hsize - shadow_offset)
         self.shadow_rect = Rectangle(p1s, p2s)
@@ -47,6 +142,9 @@ class DieView:
         self.pip5 = self.__makePip(cx + offset, cy - offset)
         self.pip6 = self.__makePip(cx + offset, cy)
         self.pip7 = self.__makePip(cx + offset, cy + offset)
+        self.pips = [self.pip1, self.pip2, self.pip3, self.pip4,
+                     self.pip5, self.pip6, self.pip7]
+        self.lit = 0         # bitmask of the pips currently lit
 
         # Add text for display of larger numbers
         self.value_text = Text(Point(cx, cy), "")
@@ -66,78 +164,87 @@ class DieView:
         pip.draw(self.win)
         return pip
 
+    def __makeSprite(self, cx, cy, hsize, shadow_offset):
+        # Internal helper that sets up sprite mode: one image per die
+        x1, _ = self.win.toScreen(cx - hsize, cy)
+        x2, _ = self.win.toScreen(cx + hsize, cy)
+        xs, _ = self.win.toScreen(cx + shadow_offset, cy)
+        x0, _ = self.win.toScreen(cx, cy)
+        self.pixels = int(round(abs(x2 - x1)))
+        self.shadow_pixels = int(round(abs(xs - x0)))
+        # the image centre sits half the shadow right of and below the face
+        anchor = Point(cx + shadow_offset / 2.0, cy - shadow_offset / 2.0)
+        self.sprite = Image(anchor, 1, 1, headless=self.win.headless)
+        self.sprite.setImage(self.__face(1))
+        self.sprite.draw(self.win)
+        self.value = 1
+
+    def __face(self, value):
+        # Internal helper returning the cached face image for value
+        colors = (self.background, self.border, self.foreground, self.shadow)
+        headless = self.win.headless
+        key = (self.pixels, self.shadow_pixels, value, colors, headless)
+        return SPRITES.get(key, lambda: renderFace(self.pixels, self.shadow_pixels, value,
+                                                   colors, headless))
+
     def setValue(self, value):
-        # set this to display value
-        # turn all pips off
-        self.pip1.setFill(self.background)
-        self.pip2.setFill(self.background)
-        self.pip3.setFill(self.background)
-        self.pip4.setFill(self.background)
-        self.pip5.setFill(self.background)
-        self.pip6.setFill(self.background)
-        self.pip7.setFill(self.background)
-        self.value_text.setText("")  # Clear any existing text
-
-        # For values 1-6, show standard pip patterns
-        if value == 1:
-            self.pip4.setFill(self.foreground)
-        elif value == 2:
-            self.pip1.setFill(self.foreground)
-            self.pip7.setFill(self.foreground)
-        elif value == 3:
-            self.pip1.setFill(self.foreground)
-            self.pip7.setFill(self.foreground)
-            self.pip4.setFill(self.foreground)
-        elif value == 4:
-            self.pip1.setFill(self.foreground)
-            self.pip3.setFill(self.foreground)
-            self.pip5.setFill(self.foreground)
-            self.pip7.setFill(self.foreground)
-        elif value == 5:
-            self.pip1.setFill(self.foreground)
-            self.pip3.setFill(self.foreground)
-            self.pip4.setFill(self.foreground)
-            self.pip5.setFill(self.foreground)
-            self.pip7.setFill(self.foreground)
-        elif value == 6:
-            self.pip1.setFill(self.foreground)
-            self.pip2.setFill(self.foreground)
-            self.pip3.setFill(self.foreground)
-            self.pip5.setFill(self.foreground)
-            self.pip6.setFill(self.foreground)
-            self.pip7.setFill(self.foreground)
-        else:
+        # set this to display value, touching only what changes
+        if value == self.value:
+            return
+        if self.sprite:
+            self.sprite.setImage(self.__face(value))
+            self.value = value
+            return
+        lit = self.PIP_MASKS.get(value, 0)
+        changed = lit ^ self.lit
+        with self.win.batch():
+            for i, pip in enumerate(self.pips):
+                if changed >> i & 1:
+                    pip.setFill(self.foreground if lit >> i & 1 else self.background)
             # For values > 6, display the number as text
-            self.value_text.setText(str(value))
+            text = "" if value in self.PIP_MASKS else str(value)
+            if text != self.value_text.getText():
+                self.value_text.setText(text)
+        self.lit = lit
+        self.value = value
 
     def hide(self):
         """Hide the die by making it invisible"""
-        if not self.is_hidden:
-            self.shadow_rect.undraw()
-            self.rect.undraw()
-            self.pip1.undraw()
-            self.pip2.undraw()
-            self.pip3.undraw()
-            self.pip4.undraw()
-            self.pip5.undraw()
-            self.pip6.undraw()
-            self.pip7.undraw()
-            self.value_text.undraw()
+        if not self.is_hidden and self.sprite:
+            self.sprite.undraw()
+            self.is_hidden = True
+        elif not self.is_hidden:
+            with self.win.batch():
+                self.shadow_rect.undraw()
+                self.rect.undraw()
+                self.pip1.undraw()
+                self.pip2.undraw()
+                self.pip3.undraw()
+                self.pip4.undraw()
+                self.pip5.undraw()
+                self.pip6.undraw()
+                self.pip7.undraw()
+                self.value_text.undraw()
             self.is_hidden = True
     
     def show(self):
         """Show the die if it's currently hidden"""
-        if self.is_hidden:
-            self.shadow_rect.draw(self.win)
-            self.rect.draw(self.win)
-            self.pip1.draw(self.win)
-            self.pip2.draw(self.win)
-            self.pip3.draw(self.win)
-            self.pip4.draw(self.win)
-            self.pip5.draw(self.win)
-            self.pip6.draw(self.win)
-            self.pip7.draw(self.win)
-            self.value_text.draw(self.win)
+        if self.is_hidden and self.sprite:
+            self.sprite.draw(self.win)
             self.is_hidden = False
-            # Refresh the display of the pips
             self.setValue(1)
+        elif self.is_hidden:
+            with self.win.batch():
+                self.shadow_rect.draw(self.win)
+                self.rect.draw(self.win)
+                self.pip1.draw(self.win)
+                self.pip2.draw(self.win)
+                self.pip3.draw(self.win)
+                self.pip4.draw(self.win)
+                self.pip5.draw(self.win)
+                self.pip6.draw(self.win)
+                self.pip7.draw(self.win)
+                self.value_text.draw(self.win)
+                self.is_hidden = False
+                # Refresh the display of the pips
+                self.setValue(1)
@@ -0,0 +1,137 @@
+"""Exact probability distributions for the sum of a pool of dice.
+
+The table for k dice is built from the table for k - 1 dice by convolving
+with one more die. Intermediate tables are kept in LRU caches, so asking
+for 50d20 after 49d20 costs a single convolution.
+
+Two kinds of table are cached. Integer counts (the number of ways to roll
+each total) are exact and need nothing beyond the standard library.
+Float probabilities are convolved with NumPy when it is installed, which
+stays fast for pools of thousands of dice.
+"""
+
+from collections import OrderedDict
+from fractions import Fraction
+
+try:  # NumPy speeds up the float tables but is optional
+    import numpy as np
+except ImportError:
+    np = None
+
+# Number of tables of each kind kept in the LRU caches
+CACHE_SIZE = 128
+
+# Pools up to this many dice get float probabilities by dividing the exact
+# counts, which rounds correctly; larger pools use the NumPy float tables.
+EXACT_FLOAT_DICE = 100
+
+_count_cache = OrderedDict()
+_prob_cache = OrderedDict()
+
+
+def _next_counts(prev, sides):
+    # Convolve a counts tuple with one more die. Convolving with a uniform
+    # die is a sliding window sum, so this is a single linear pass.
+    size = len(prev) + sides - 1
+    counts = [0] * size
+    window = 0
+    for i in range(size):
+        # window is the sum of prev[i - sides + 1 .. i]
+        if i < len(prev):
+            window += prev[i]
+        if i >= sides:
+            window -= prev[i - sides]
+        counts[i] = window
+    return tuple(counts)
+
+
+def _next_probs(prev, sides):
+    # Convolve a float probability array with one more die
+    table = np.convolve(prev, np.full(sides, 1.0 / sides))
+    table.flags.writeable = False
+    return table
+
+
+def _check(num_dice, sides):
+    # Internal helper to validate a dice pool
+    if num_dice < 0:
+        raise ValueError("num_dice must be non-negative")
+    if sides < 1:
+        raise ValueError("sides must be at least 1")
+
+
+def _table(cache, step, base, num_dice, sides):
+    # Return the table for num_dice dice, starting from the largest cached
+    # table for the same sides and convolving the remaining dice onto it
+    _check(num_dice, sides)
+    k = num_dice
+    while k > 0 and (k, sides) not in cache:
+        k -= 1
+    if k > 0:
+        table = cache[(k, sides)]
+        cache.move_to_end((k, sides))
+    else:
+        table = base
+    for k in range(k + 1, num_dice + 1):
+        table = step(table, sides)
+        cache[(k, sides)] = table
+        if len(cache) > CACHE_SIZE:
+            cache.popitem(last=False)
+    return table
+
+
+def _count_table(num_dice, sides):
+    # Ways to roll each total num_dice..num_dice*sides, as a tuple
+    return _table(_count_cache, _next_counts, (1,), num_dice, sides)
+
+
+def _prob_table(num_dice, sides):
+    # Probability of each total num_dice..num_dice*sides, as a read-only
+    # NumPy array
+    return _table(_prob_cache, _next_probs, np.ones(1), num_dice, sides)
+
+
+def counts(num_dice, sides):
+    """Return a dict mapping each possible total to the number of ways it
+    can be rolled with num_dice dice of the given number of sides"""
+    table = _count_table(num_dice, sides)
+    return {num_dice + i: ways for i, ways in enumerate(table)}
+
+
+def pmf(num_dice, sides, exact=False):
+    """Return a dict mapping each total to its probability.
+    With exact=True the probabilities are Fractions instead of floats"""
+    if exact:
+        outcomes = sides ** num_dice
+        return {total: Fraction(ways, outcomes)
+                for total, ways in counts(num_dice, sides).items()}
+    if np is None or num_dice <= EXACT_FLOAT_DICE:
+        outcomes = sides ** num_dice
+        return {total: ways / outcomes for total, ways in counts(num_dice, sides).items()}
+    table = _prob_table(num_dice, sides)
+    return dict(zip(range(num_dice, num_dice + len(table)), table.tolist()))
+
+
+def cdf(num_dice, sides, exact=False):
+    """Return a dict mapping each total t to the probability of rolling
+    at most t"""
+    result = {}
+    running = 0
+    for total, p in pmf(num_dice, sides, exact).items():
+        running += p
+        result[total] = running
+    if not exact and result:
+        # guard against rounding drift in the last entry
+        result[num_dice * sides] = 1.0
+    return result
+
+
+def probability(total, num_dice, sides, exact=False):
+    """Return the probability of rolling exactly total"""
+    return pmf(num_dice, sides, exact).get(total, Fraction(0) if exact else 0.0)
+
+
+def cache_clear():
+    """Drop all cached convolution tables"""
+    _count_cache.clear()
+    _prob_cache.clear()
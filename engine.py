@@ -0,0 +1,142 @@
+"""Headless dice rolling engine.
+
+Everything needed to roll dice without a window lives here, so this module
+must never import graphics. The GUI in roller.py is a thin client of it.
+
+Every function takes an optional rng argument selecting the random source;
+see randomness.py for the accepted values. The list APIs default to the
+calling thread's Python stream and the array APIs to its PCG64 stream.
+"""
+
+import randomness
+
+try:  # NumPy is only needed for the vectorized batch APIs
+    import numpy as np
+except ImportError:
+    np = None
+
+# Number of dice generated per chunk by roll_totals_array, which keeps the
+# temporary face buffer small enough to stay in cache.
+CHUNK_DICE = 1 << 20
+
+
+def _check(num_dice, sides):
+    # Internal helper to validate a dice pool
+    if num_dice < 0:
+        raise ValueError("num_dice must be non-negative")
+    if sides < 1:
+        raise ValueError("sides must be at least 1")
+
+
+def roll_die(sides, rng=None):
+    """Roll a single die and return a face in 1..sides"""
+    _check(1, sides)
+    return randomness.get(rng).randint(sides)
+
+
+def roll(num_dice, sides, rng=None):
+    """Roll num_dice dice with the given number of sides and return the
+    list of faces"""
+    _check(num_dice, sides)
+    return randomness.get(rng).faces(num_dice, sides)
+
+
+def roll_total(num_dice, sides, rng=None):
+    """Roll num_dice dice and return only their sum"""
+    return sum(roll(num_dice, sides, rng))
+
+
+def roll_many(num_rolls, num_dice, sides, rng=None):
+    """Roll the same pool num_rolls times and return a list of face lists"""
+    _check(num_dice, sides)
+    if num_dice == 0:
+        return [[] for _ in range(num_rolls)]
+    faces = randomness.get(rng).faces(num_rolls * num_dice, sides)
+    return [faces[i:i + num_dice] for i in range(0, len(faces), num_dice)]
+
+
+def roll_totals(num_rolls, num_dice, sides, rng=None):
+    """Roll the same pool num_rolls times and return the list of totals"""
+    return [sum(faces) for faces in roll_many(num_rolls, num_dice, sides, rng)]
+
+
+def _array_source(rng):
+    # Internal helper resolving rng for the batch APIs
+    if np is None:
+        raise ImportError("the vectorized batch APIs require numpy")
+    return randomness.get(rng, "pcg64")
+
+
+def _face_dtype(sides):
+    # Smallest unsigned integer type that can hold every face
+    if sides <= 0xFF:
+        return np.uint8
+    if sides <= 0xFFFF:
+        return np.uint16
+    if sides <= 0xFFFFFFFF:
+        return np.uint32
+    return np.uint64
+
+
+def roll_array(num_rolls, num_dice, sides, rng=None):
+    """Roll the same pool num_rolls times in one call and return a
+    (num_rolls, num_dice) NumPy array of faces in 1..sides"""
+    _check(num_dice, sides)
+    source = _array_source(rng)
+    return source.face_array((num_rolls, num_dice), sides, _face_dtype(sides))
+
+
+def roll_totals_array(num_rolls, num_dice, sides, rng=None):
+    """Roll the same pool num_rolls times and return a NumPy int64 array
+    of totals. Faces are generated in chunks so memory stays bounded no
+    matter how many dice are rolled"""
+    _check(num_dice, sides)
+    source = _array_source(rng)
+    totals = np.zeros(num_rolls, dtype=np.int64)
+    if num_dice == 0:
+        return totals
+    step = max(1, CHUNK_DICE // num_dice)
+    for start in range(0, num_rolls, step):
+        stop = min(start + step, num_rolls)
+        faces = roll_array(stop - start, num_dice, sides, source)
+        faces.sum(axis=1, dtype=np.int64, out=totals[start:stop])
+    return totals
+
+
+def stream(num_dice, sides, limit=None, rng=None, batch=1024):
+    """Yield face lists one roll at a time, forever or for limit rolls.
+    Rolls are generated batch at a time, so memory stays constant and
+    nothing is rolled until the consumer asks for it"""
+    _check(num_dice, sides)
+    if batch < 1:
+        raise ValueError("batch must be at least 1")
+    return _stream(num_dice, sides, limit, randomness.get(rng), batch)
+
+
+def _stream(num_dice, sides, limit, source, batch):
+    # Generator behind stream, so its arguments are checked on the call
+    remaining = limit
+    while remaining is None or remaining > 0:
+        count = batch if remaining is None else min(batch, remaining)
+        yield from roll_many(count, num_dice, sides, source)
+        if remaining is not None:
+            remaining -= count
+
+
+def stream_arrays(num_dice, sides, chunk_rolls=65536, limit=None, rng=None):
+    """Yield (rolls, num_dice) NumPy face arrays of up to chunk_rolls rolls
+    each, forever or until limit rolls have been produced"""
+    _check(num_dice, sides)
+    if chunk_rolls < 1:
+        raise ValueError("chunk_rolls must be at least 1")
+    return _stream_arrays(num_dice, sides, chunk_rolls, limit, _array_source(rng))
+
+
+def _stream_arrays(num_dice, sides, chunk_rolls, limit, source):
+    # Generator behind stream_arrays, so its arguments are checked on the call
+    remaining = limit
+    while remaining is None or remaining > 0:
+        count = chunk_rolls if remaining is None else min(chunk_rolls, remaining)
+        yield roll_array(count, num_dice, sides, source)
+        if remaining is not None:
+            remaining -= count
@@ -0,0 +1,286 @@
+"""Streaming fairness tests for dice.
+
+FairnessTest takes rolls of one pool a chunk at a time and keeps only
+fixed-size running sums, so memory stays bounded however many rolls pass
+through and a billion rolls need a single pass. Each chunk is one NumPy
+array and is reduced with vectorized operations. report() gives p-values
+for four tests:
+
+    faces    chi-square goodness of fit of the face counts to uniform
+    totals   chi-square of the roll totals against their exact distribution
+    serial   lag-1 serial correlation of the faces, in the order rolled
+    runs     Wald-Wolfowitz runs of faces above and below the mean face
+
+A small p-value (say below 0.001) is evidence that the dice are not fair.
+
+Run with:
+    python -m fairness rolls.log                    test every pool in a history log
+    python -m fairness --dice 5 --sides 6 --rolls 1000000   test the engine
+"""
+
+import argparse
+import math
+import sys
+from collections import namedtuple
+
+import distribution
+import engine
+import history
+import randomness
+
+try:  # NumPy does the per-chunk reductions
+    import numpy as np
+except ImportError:
+    np = None
+
+# Smallest expected count for a chi-square bin; sparser bins are merged
+MIN_EXPECTED = 5.0
+
+Result = namedtuple("Result", "statistic df p_value")
+Report = namedtuple("Report", "num_dice sides rolls faces totals serial runs")
+
+
+def _gamma_q(a, x):
+    # Regularized upper incomplete gamma function Q(a, x)
+    if x <= 0:
+        return 1.0
+    log_prefix = a * math.log(x) - x - math.lgamma(a)
+    if x < a + 1:
+        # series for P(a, x)
+        term = total = 1.0 / a
+        n = a
+        while abs(term) > abs(total) * 1e-15:
+            n += 1
+            term *= x / n
+            total += term
+        return max(0.0, 1.0 - total * math.exp(log_prefix))
+    # continued fraction for Q(a, x), by the modified Lentz method
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    i = 1
+    while True:
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-15:
+            break
+        i += 1
+    return math.exp(log_prefix) * h
+
+
+def chi2_sf(statistic, df):
+    """Probability that a chi-square variable with df degrees of freedom
+    is at least statistic"""
+    return _gamma_q(df / 2.0, statistic / 2.0)
+
+
+def normal_p(z):
+    """Two-sided p-value of a standard normal z score"""
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def _chi_square(observed, expected):
+    # Chi-square test of observed counts against expected counts, merging
+    # neighbouring bins until each expects at least MIN_EXPECTED
+    merged = []
+    obs = exp = 0.0
+    for o, e in zip(observed, expected):
+        obs += o
+        exp += e
+        if exp >= MIN_EXPECTED:
+            merged.append((obs, exp))
+            obs = exp = 0.0
+    if exp and merged:
+        last_obs, last_exp = merged.pop()
+        merged.append((last_obs + obs, last_exp + exp))
+    if len(merged) < 2:
+        return Result(0.0, 0, 1.0)
+    statistic = sum((o - e) ** 2 / e for o, e in merged)
+    df = len(merged) - 1
+    return Result(statistic, df, chi2_sf(statistic, df))
+
+
+class FairnessTest:
+    """Running fairness tests for rolls of num_dice dice with the given
+    number of sides"""
+
+    def __init__(self, num_dice, sides):
+        if np is None:
+            raise ImportError("FairnessTest requires numpy")
+        if num_dice < 1 or sides < 1:
+            raise ValueError("num_dice and sides must be at least 1")
+        self.num_dice = num_dice
+        self.sides = sides
+        self.rolls = 0
+        self.face_counts = np.zeros(sides + 1, dtype=np.int64)
+        self.total_counts = np.zeros(num_dice * sides + 1, dtype=np.int64)
+        # serial correlation: sums over pairs of consecutive faces
+        self.last_face = None
+        self.pairs = 0
+        self.pair_sum = 0        # sum of x[i] * x[i+1]
+        self.first_sum = 0       # sum of x[i]
+        self.second_sum = 0      # sum of x[i+1]
+        # runs above and below the mean face; faces equal to it are skipped
+        self.last_sign = 0
+        self.runs = 0
+        self.above = 0
+        self.below = 0
+
+    def update(self, faces):
+        """Add a chunk of rolls: an array or list of shape (rolls, num_dice)"""
+        faces = np.asarray(faces, dtype=np.int64)
+        if faces.ndim != 2 or faces.shape[1] != self.num_dice:
+            raise ValueError("expected rolls of {} dice".format(self.num_dice))
+        if not faces.size:
+            return
+        if faces.min() < 1 or faces.max() > self.sides:
+            raise ValueError("faces must be between 1 and {}".format(self.sides))
+        self.rolls += len(faces)
+        self.face_counts += np.bincount(faces.ravel(), minlength=self.sides + 1)
+        self.total_counts += np.bincount(faces.sum(axis=1), minlength=len(self.total_counts))
+
+        # serial pairs, including the one spanning the previous chunk
+        flat = faces.ravel()
+        if self.last_face is not None:
+            flat = np.concatenate(([self.last_face], flat))
+        first, second = flat[:-1], flat[1:]
+        self.pairs += len(first)
+        self.pair_sum += int(np.dot(first, second))
+        self.first_sum += int(first.sum())
+        self.second_sum += int(second.sum())
+        self.last_face = int(faces[-1, -1])
+
+        # runs: a new run starts wherever the sign differs from the last one
+        signs = np.sign(2 * faces.ravel() - (self.sides + 1))
+        signs = signs[signs != 0]
+        if len(signs):
+            self.above += int((signs > 0).sum())
+            self.below += int((signs < 0).sum())
+            self.runs += int((signs[1:] != signs[:-1]).sum()) + int(signs[0] != self.last_sign)
+            self.last_sign = int(signs[-1])
+
+    def faces_test(self):
+        """Chi-square of the face counts against a uniform die"""
+        expected = self.rolls * self.num_dice / float(self.sides)
+        return _chi_square(self.face_counts[1:].tolist(), [expected] * self.sides)
+
+    def totals_test(self):
+        """Chi-square of the totals against their exact distribution"""
+        probs = distribution.pmf(self.num_dice, self.sides)
+        low, high = self.num_dice, self.num_dice * self.sides
+        expected = [self.rolls * probs.get(t, 0.0) for t in range(low, high + 1)]
+        return _chi_square(self.total_counts[low:high + 1].tolist(), expected)
+
+    def serial_test(self):
+        """Lag-1 serial correlation of the faces, with the z score as the
+        statistic. Uses the known mean and variance of a fair die"""
+        variance = (self.sides ** 2 - 1) / 12.0
+        if not self.pairs or not variance:
+            return Result(0.0, None, 1.0)
+        mean = (self.sides + 1) / 2.0
+        covariance = (self.pair_sum - mean * (self.first_sum + self.second_sum)
+                      + self.pairs * mean * mean) / self.pairs
+        z = covariance / variance * math.sqrt(self.pairs)
+        return Result(z, None, normal_p(z))
+
+    def runs_test(self):
+        """Wald-Wolfowitz runs test above/below the mean face, with the z
+        score as the statistic"""
+        n1, n2 = self.above, self.below
+        n = n1 + n2
+        if not n1 or not n2:
+            return Result(0.0, None, 1.0)
+        expected = 2.0 * n1 * n2 / n + 1
+        variance = (expected - 1) * (expected - 2) / (n - 1)
+        if variance <= 0:
+            return Result(0.0, None, 1.0)
+        z = (self.runs - expected) / math.sqrt(variance)
+        return Result(z, None, normal_p(z))
+
+    def report(self):
+        return Report(self.num_dice, self.sides, self.rolls, self.faces_test(),
+                      self.totals_test(), self.serial_test(), self.runs_test())
+
+
+def check_stream(num_rolls, num_dice, sides, rng=None, chunk_rolls=65536):
+    """Roll the pool num_rolls times with the engine, chunk by chunk, and
+    return the Report"""
+    test = FairnessTest(num_dice, sides)
+    for chunk in engine.stream_arrays(num_dice, sides, chunk_rolls, num_rolls, rng):
+        test.update(chunk)
+    return test.report()
+
+
+def check_chunks(chunks, num_dice, sides):
+    """Run the tests over an iterable of roll arrays and return the Report"""
+    test = FairnessTest(num_dice, sides)
+    for chunk in chunks:
+        test.update(chunk)
+    return test.report()
+
+
+def check_log(path):
+    """Test every pool in a history log in one pass over the file and
+    return a dict mapping (num_dice, sides) to its Report"""
+    tests = {}
+    with history.read(path) as view:
+        for chunk in view.chunks():
+            _update_pools(tests, chunk)
+    return {pool: test.report() for pool, test in sorted(tests.items())}
+
+
+def _update_pools(tests, records):
+    # Feed each pool's rolls in a chunk of log records to its test
+    keys = records["dice"].astype(np.int64) << 32 | records["sides"]
+    for key in np.unique(keys).tolist():
+        num_dice, sides = key >> 32, key & 0xFFFFFFFF
+        if not num_dice:
+            continue
+        test = tests.get((num_dice, sides))
+        if test is None:
+            test = tests[num_dice, sides] = FairnessTest(num_dice, sides)
+        test.update(records["faces"][keys == key, :num_dice])
+
+
+def format_report(report):
+    """Describe a Report in a few lines"""
+    lines = ["{}d{}: {:,} rolls".format(report.num_dice, report.sides, report.rolls)]
+    for name in ("faces", "totals", "serial", "runs"):
+        result = getattr(report, name)
+        kind = "chi2" if result.df is not None else "z"
+        df = " (df {})".format(result.df) if result.df is not None else ""
+        lines.append("  {:<7} {} = {:.4f}{}  p = {:.4g}".format(
+            name, kind, result.statistic, df, result.p_value))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m fairness",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("log", nargs="?", help="history log to test")
+    parser.add_argument("--dice", type=int, default=5)
+    parser.add_argument("--sides", type=int, default=6)
+    parser.add_argument("--rolls", type=int, default=1000000,
+                        help="rolls to make with the engine when no log is given")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+    if args.log:
+        reports = list(check_log(args.log).values())
+    else:
+        rng = None if args.seed is None else randomness.NumpyRNG(args.seed)
+        reports = [check_stream(args.rolls, args.dice, args.sides, rng)]
+    for report in reports:
+        print(format_report(report))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
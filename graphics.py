@@ -35,13 +35,20 @@ See http://mcsp.wartburg.edu/zelle/python for a quick reference"""
 
 __version__ = "5.0"
 
-import time, os, sys
+import time, os, sys, base64
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 
 try:  # import as appropriate for 2.x vs. 3.x
    import tkinter as tk
 except:
    import tkinter as tk
 
+try:  # NumPy lets Transform convert whole arrays of points at once
+    import numpy as np
+except ImportError:
+    np = None
+
 
 ##########################################################################
 # Module Exceptions
@@ -57,8 +64,52 @@ BAD_OPTION = "Illegal option value"
 ##########################################################################
 # global variables and funtions
 
-_root = tk.Tk()
-_root.withdraw()
+# The Tk root is created by the first window or image, not at import
+# time, so importing this module needs no display.
+_root = None
+
+def _getRoot():
+    global _root
+    if _root is None:
+        _root = tk.Tk()
+        _root.withdraw()
+    return _root
+
+# Drawing backend for new windows and images: "tk" draws on screen,
+# "headless" records into an in-memory scene (see scene.py).
+_backend = os.environ.get("GRAPHICS_BACKEND", "tk")
+
+def setBackend(name):
+    """Choose the backend used by windows and images created from now on:
+    "tk" or "headless". The GRAPHICS_BACKEND environment variable sets the
+    initial choice."""
+    global _backend
+    if name not in ("tk", "headless"):
+        raise GraphicsError(BAD_OPTION)
+    _backend = name
+
+def _makePhoto(headless=None, **options):
+    # Create a tk.PhotoImage, or a scene.Photo when headless; None follows
+    # the backend
+    if headless is None:
+        headless = _backend == "headless"
+    if headless:
+        import scene
+        return scene.Photo(**options)
+    return tk.PhotoImage(master=_getRoot(), **options)
+
+def _photoFor(img, headless):
+    # Return img, or a copy of its pixels as the other kind of photo if it
+    # does not match a headless (or Tk) window
+    if headless != (not isinstance(img, tk.PhotoImage)):
+        import scene
+        if headless:
+            photo = scene.Photo(img.width(), img.height())
+            photo.put(b"P6\n%d %d\n255\n" % (img.width(), img.height()) + bytes(_photoRGB(img)))
+            return photo
+        png = scene.encodePNG(img.width(), img.height(), img.data, alpha=True)
+        return _makePhoto(False, data=base64.b64encode(png).decode("ascii"), format="png")
+    return img
 
 _update_lasttime = time.time()
 
@@ -73,40 +124,68 @@ def update(rate=None):
         else:
             _update_lasttime = now
 
-    _root.update()
+    if _root is not None:
+        _root.update()
 
 ############################################################################
 # Graphics classes start here
         
 class GraphWin(tk.Canvas):
 
-    """A GraphWin is a toplevel window for displaying graphics."""
+    """A GraphWin is a toplevel window for displaying graphics.
+    Pass headless=True (or select the headless backend) to draw into an
+    in-memory scene instead of a Tk window."""
+
+    headless = False
+
+    def __new__(cls, *args, headless=None, **kwargs):
+        if headless is None:
+            headless = _backend == "headless"
+        if cls is GraphWin and headless:
+            cls = HeadlessWin
+        return tk.Canvas.__new__(cls)
 
     def __init__(self, title="Graphics Window",
-                 width=200, height=200, autoflush=True):
+                 width=200, height=200, autoflush=True, headless=None):
         assert type(title) == type(""), "Title must be a string"
-        master = tk.Toplevel(_root)
-        master.protocol("WM_DELETE_WINDOW", self.close)
-        tk.Canvas.__init__(self, master, width=width, height=height,
-                           highlightthickness=0, bd=0)
-        self.master.title(title)
-        self.pack()
-        master.resizable(0,0)
         self.foreground = "black"
-        self.items = []
+        self.items = {}  # drawn objects by Tk id, in drawing (z) order
+        self._plots = {}  # images made by plotPixels, by item id
+        self._tagged = {}  # drawn objects by Tk id, for each tag in use
+        self._regions = {}  # ClickRegions by the order they were added in
+        self._regionCount = 0
+        self._clickIndex = None  # screen cell -> regions over it; None when stale
+        self._lastClick = None  # (x, y, region) of the latest click, in world coordinates
         self.mouseX = None
         self.mouseY = None
-        self.bind("<Button-1>", self._onClick)
-        self.bind_all("<Key>", self._onKey)
         self.height = int(height)
         self.width = int(width)
         self.autoflush = autoflush
+        self._batchDepth = 0
+        self._dirty = {}
         self._mouseCallback = None
+        self._clickHandler = None
         self.trans = None
         self.closed = False
-        master.lift()
         self.lastKey = ""
-        if autoflush: _root.update()
+        self._openWindow(title, self.width, self.height)
+        if autoflush: self.update()
+
+    def _openWindow(self, title, width, height):
+        # Create the Tk toplevel and canvas for this window
+        master = tk.Toplevel(_getRoot())
+        master.protocol("WM_DELETE_WINDOW", self.close)
+        tk.Canvas.__init__(self, master, width=width, height=height,
+                           highlightthickness=0, bd=0)
+        self.master.title(title)
+        self.pack()
+        master.resizable(0,0)
+        self.bind("<Button-1>", self._onClick)
+        self.bind_all("<Key>", self._onKey)
+        # written by every click, key press and close so that getMouse and
+        # getKey can block in Tk's event loop instead of polling
+        self._inputEvent = tk.IntVar(_root)
+        master.lift()
 
     def __repr__(self):
         if self.isClosed():
@@ -125,6 +204,7 @@ class GraphWin(tk.Canvas):
 
     def _onKey(self, evnt):
         self.lastKey = evnt.keysym
+        self._inputEvent.set(1)
 
 
     def setBackground(self, color):
@@ -137,6 +217,7 @@ class GraphWin(tk.Canvas):
         """Set coordinates of window to run from (x1,y1) in the
         lower-left corner to (x2,y2) in the upper-right corner."""
         self.trans = Transform(self.width, self.height, x1, y1, x2, y2)
+        self._clickIndex = None
         self.redraw()
 
     def close(self):
@@ -144,6 +225,7 @@ class GraphWin(tk.Canvas):
 
         if self.closed: return
         self.closed = True
+        self._inputEvent.set(1)  # wake up getMouse/getKey
         self.master.destroy()
         self.__autoflush()
 
@@ -158,7 +240,7 @@ class GraphWin(tk.Canvas):
 
     def __autoflush(self):
         if self.autoflush:
-            _root.update()
+            self.update()
 
     
     def plot(self, x, y, color="black"):
@@ -174,11 +256,83 @@ class GraphWin(tk.Canvas):
         self.__checkOpen()
         self.create_line(x,y,x+1,y, fill=color)
         self.__autoflush()
+
+    def plotPoints(self, xs, ys, color="black"):
+        """Set every pixel (xs[i],ys[i]) to the given color. xs and ys
+        are sequences or NumPy arrays of window coordinates. All the
+        points are drawn as one image, so this is far cheaper than
+        calling plot for each point. Returns the item id, as plotPixels"""
+        self.__checkOpen()
+        xs, ys = self.toScreenPoints(xs, ys)
+        return self.plotPixels(xs, ys, color)
+
+    def plotPixels(self, xs, ys, color="black"):
+        """Set every raw pixel (xs[i],ys[i]) to color with a single
+        image blit. Returns the id of the image item, for deletePlot, or
+        None if no point is in the window"""
+        self.__checkOpen()
+        block = _pixelBlock(self.width, self.height, xs, ys, self._rgb(color))
+        if block is None:
+            return None
+        import scene
+        x0, y0, width, height, rgba = block
+        png = scene.encodePNG(width, height, rgba, alpha=True)
+        photo = _makePhoto(self.headless, data=base64.b64encode(png).decode("ascii"),
+                           format="png")
+        id = self.create_image(x0, y0, image=photo, anchor="nw")
+        self._plots[id] = photo  # Tk does not keep a reference
+        self.__autoflush()
+        return id
+
+    def deletePlot(self, id):
+        """Remove a plot made by plotPoints or plotPixels and free its image"""
+        if self._plots.pop(id, None) is not None and not self.closed:
+            self.delete(id)
+            self.__autoflush()
+
+    def _rgb(self, color):
+        # Internal helper giving the 8-bit (r, g, b) of a Tk color
+        r, g, b = self.winfo_rgb(color)
+        return r >> 8, g >> 8, b >> 8
       
     def flush(self):
         """Update drawing to the window"""
         self.__checkOpen()
         self.update_idletasks()
+
+    @contextmanager
+    def batch(self):
+        """Context manager that groups drawing into a single screen update.
+        Inside the block autoflush is suspended and repeated changes to the
+        same object are applied once, when the outermost block exits.
+
+            with win.batch():
+                for die in dice:
+                    die.setValue(6)
+        """
+        autoflush = self.autoflush
+        self.autoflush = False
+        self._batchDepth += 1
+        try:
+            yield self
+        finally:
+            self._batchDepth -= 1
+            self.autoflush = autoflush
+            if self._batchDepth == 0:
+                self._flushDirty()
+                self.__autoflush()
+
+    def _markDirty(self, item):
+        # Remember an item whose config changed inside a batch
+        self._dirty[item.id] = item
+
+    def _flushDirty(self):
+        # Apply the config of every item changed during a batch
+        dirty, self._dirty = self._dirty, {}
+        if self.closed: return
+        for id, item in dirty.items():
+            if item.canvas is self and item.id == id:
+                self.itemconfig(id, item.config)
         
     def getMouse(self):
         """Wait for mouse click and return Point object representing
@@ -187,9 +341,8 @@ class GraphWin(tk.Canvas):
         self.mouseX = None
         self.mouseY = None
         while self.mouseX == None or self.mouseY == None:
-            self.update()
             if self.isClosed(): raise GraphicsError("getMouse in closed window")
-            time.sleep(.1) # give up thread
+            self.wait_variable(self._inputEvent) # sleep until an event arrives
         x,y = self.toWorld(self.mouseX, self.mouseY)
         self.mouseX = None
         self.mouseY = None
@@ -213,9 +366,8 @@ class GraphWin(tk.Canvas):
         """Wait for user to press a key and return it as a string."""
         self.lastKey = ""
         while self.lastKey == "":
-            self.update()
             if self.isClosed(): raise GraphicsError("getKey in closed window")
-            time.sleep(.1) # give up thread
+            self.wait_variable(self._inputEvent) # sleep until an event arrives
 
         key = self.lastKey
         self.lastKey = ""
@@ -251,28 +403,376 @@ class GraphWin(tk.Canvas):
             return self.trans.world(x,y)
         else:
             return x,y
+
+    def toScreenPoints(self, xs, ys):
+        """toScreen for sequences or NumPy arrays of coordinates"""
+        if self.trans:
+            return self.trans.screenPoints(xs, ys)
+        return xs, ys
+
+    def toWorldPoints(self, xs, ys):
+        """toWorld for sequences or NumPy arrays of coordinates"""
+        if self.trans:
+            return self.trans.worldPoints(xs, ys)
+        return xs, ys
         
     def setMouseHandler(self, func):
         self._mouseCallback = func
+
+    def setClickHandler(self, func):
+        """Call func(p) as soon as the window is clicked, where p is the
+        Point clicked in window coordinates. Pass None to remove it."""
+        self._clickHandler = func
+
+    def run(self):
+        """Process events, calling the click handler, until the window
+        is closed"""
+        if not self.closed:
+            self.wait_window(self)
         
     def _onClick(self, e):
         self.mouseX = e.x
         self.mouseY = e.y
+        self._inputEvent.set(1)
         if self._mouseCallback:
             self._mouseCallback(Point(e.x, e.y))
+        if self._regions or self._clickHandler:
+            p = Point(*self.toWorld(e.x, e.y))
+            region = self.regionAt(p)
+            self._lastClick = (p.x, p.y, region)
+            if region:
+                region.handler(p)
+            elif self._clickHandler:
+                self._clickHandler(p)
+        else:
+            self._lastClick = None
+
+    def handledBy(self, p):
+        """Return the ClickRegion that handled the latest click if p is
+        where it was, as from getMouse, or None"""
+        if self._lastClick is None:
+            return None
+        x, y, region = self._lastClick
+        return region if (x, y) == (p.getX(), p.getY()) else None
+
+    # Side, in pixels, of the square cells of the click region index
+    CLICK_CELL = 32
+
+    def addClickRegion(self, xmin, ymin, xmax, ymax, handler, layer=0):
+        """Send clicks inside the rectangle (in window coordinates) to
+        handler(p) instead of the click handler, and return the new
+        ClickRegion. Where regions overlap, the highest layer wins, then
+        the region added last"""
+        self._regionCount += 1
+        region = ClickRegion(self, handler, layer, self._regionCount)
+        self._regions[region.order] = region
+        region.setBounds(xmin, ymin, xmax, ymax)
+        return region
+
+    def removeClickRegion(self, region):
+        """Stop sending clicks to region"""
+        if self._regions.pop(region.order, None) is region:
+            self._unindex(region)
+
+    def regionAt(self, p):
+        """Return the enabled ClickRegion a click at Point p would go to,
+        or None"""
+        if self._clickIndex is None:
+            self._clickIndex = {}
+            for region in self._regions.values():
+                self._index(region)
+        cell = self.CLICK_CELL
+        xs, ys = self.toScreen(p.x, p.y)
+        best = None
+        for region in self._clickIndex.get((int(xs // cell), int(ys // cell)), ()):
+            if (region.enabled and region.contains(p.x, p.y) and
+                    (best is None or (region.layer, region.order) > (best.layer, best.order))):
+                best = region
+        return best
+
+    def _index(self, region):
+        # Internal helper adding region to the cells its bounds cover. A
+        # pixel of slack covers rounding in the world to screen transform
+        if self._clickIndex is None:
+            return
+        self._unindex(region)
+        cell = self.CLICK_CELL
+        x1, y1 = self.toScreen(region.xmin, region.ymin)
+        x2, y2 = self.toScreen(region.xmax, region.ymax)
+        # without setCoords the bounds are the (possibly float) world values
+        cols = range(int((min(x1, x2) - 1) // cell), int((max(x1, x2) + 1) // cell) + 1)
+        rows = range(int((min(y1, y2) - 1) // cell), int((max(y1, y2) + 1) // cell) + 1)
+        region.cells = [(col, row) for col in cols for row in rows]
+        for key in region.cells:
+            self._clickIndex.setdefault(key, set()).add(region)
+
+    def _unindex(self, region):
+        # Internal helper removing region from the index
+        if self._clickIndex is not None:
+            for key in region.cells:
+                self._clickIndex.get(key, set()).discard(region)
+        region.cells = []
 
     def addItem(self, item):
-        self.items.append(item)
+        self.items[item.id] = item
+        tag = item.config.get("tags")
+        if tag:
+            self._tagged.setdefault(tag, {})[item.id] = item
 
     def delItem(self, item):
-        self.items.remove(item)
+        self.items.pop(item.id, None)
+        tag = item.config.get("tags")
+        if tag:
+            self._tagged.get(tag, {}).pop(item.id, None)
+
+    def setTagVisible(self, tag, visible):
+        """Show or hide every object given tag (see GraphicsObject.setTag)
+        with a single canvas call. Hidden objects stay drawn, so showing
+        them again is much cheaper than drawing them anew"""
+        self.__checkOpen()
+        state = "normal" if visible else "hidden"
+        for item in self._tagged.get(tag, {}).values():
+            item.config["state"] = state
+        self.itemconfig(tag, state=state)
+        self.__autoflush()
+
+    def raiseTag(self, tag):
+        """Move every object given tag above all other objects"""
+        self.__checkOpen()
+        self.tag_raise(tag)
+        self.__autoflush()
 
     def redraw(self):
-        for item in self.items[:]:
+        for item in list(self.items.values()):
             item.undraw()
             item.draw(self)
         self.update()
         
+
+
+class _HeadlessMaster:
+    # Stands in for the Tk toplevel of a headless window
+    def __init__(self, title):
+        self._title = title
+
+    def title(self, title=None):
+        if title is not None:
+            self._title = title
+        return self._title
+
+    def destroy(self):
+        pass
+
+
+class _HeadlessVar:
+    # Stands in for the Tk variable written on input events
+    def set(self, value):
+        pass
+
+
+class _HeadlessEvent:
+    # Stands in for a Tk event
+    def __init__(self, x=0, y=0, keysym=""):
+        self.x = x
+        self.y = y
+        self.keysym = keysym
+
+
+class HeadlessWin(GraphWin):
+
+    """A GraphWin that records drawing into an in-memory scene.Scene
+    instead of a Tk window, so it needs no display. Every canvas operation
+    is timed in scene.timings, and save() writes the window as a PNG.
+
+    Input is simulated: click() and key() deliver an event at once, while
+    queueClick() and queueKey() line events up for getMouse, getKey and
+    run to consume. Timer callbacks run from update() once they are due."""
+
+    headless = True
+
+    def _openWindow(self, title, width, height):
+        import scene
+        self.master = _HeadlessMaster(title)
+        self.scene = scene.Scene(width, height)
+        self._inputEvent = _HeadlessVar()
+        self._events = deque()
+        self._timers = {}
+        self._timerCount = 0
+
+    def _create(self, kind, args, options):
+        # Record a new item; args mixes coordinates and option dicts
+        coords = []
+        config = {}
+        for arg in args:
+            if isinstance(arg, dict):
+                config.update(arg)
+            elif isinstance(arg, (list, tuple)):
+                coords.extend(arg)
+            else:
+                coords.append(arg)
+        config.update(options)
+        with self.scene.timed("create_" + kind):
+            return self.scene.create(kind, coords, config)
+
+    def create_rectangle(self, *args, **options):
+        return self._create("rectangle", args, options)
+
+    def create_oval(self, *args, **options):
+        return self._create("oval", args, options)
+
+    def create_line(self, *args, **options):
+        return self._create("line", args, options)
+
+    def create_polygon(self, *args, **options):
+        return self._create("polygon", args, options)
+
+    def create_text(self, *args, **options):
+        return self._create("text", args, options)
+
+    def create_image(self, *args, **options):
+        return self._create("image", args, options)
+
+    def create_window(self, *args, **options):
+        return self._create("window", args, options)
+
+    def itemconfig(self, id, cnf=None, **options):
+        config = dict(cnf or {})
+        config.update(options)
+        with self.scene.timed("itemconfig"):
+            self.scene.itemconfig(id, config)
+
+    itemconfigure = itemconfig
+
+    def coords(self, id, *args):
+        coords = []
+        for arg in args:
+            if isinstance(arg, (list, tuple)):
+                coords.extend(arg)
+            else:
+                coords.append(arg)
+        with self.scene.timed("coords"):
+            return self.scene.coords(id, coords or None)
+
+    def tag_raise(self, tagOrId, aboveThis=None):
+        with self.scene.timed("tag_raise"):
+            self.scene.raiseItems(tagOrId)
+
+    def move(self, id, dx, dy):
+        with self.scene.timed("move"):
+            self.scene.move(id, dx, dy)
+
+    def delete(self, id):
+        with self.scene.timed("delete"):
+            self.scene.delete(id)
+
+    def config(self, cnf=None, **options):
+        options.update(cnf or {})
+        if "bg" in options:
+            self.scene.background = options["bg"]
+
+    configure = config
+
+    def update(self):
+        """Run any timer callbacks that are due"""
+        with self.scene.timed("update"):
+            now = time.monotonic()
+            for id, (due, func, args) in list(self._timers.items()):
+                if due <= now and self._timers.pop(id, None):
+                    func(*args)
+
+    def update_idletasks(self):
+        pass
+
+    def _rgb(self, color):
+        import scene
+        return scene.parseColor(color) or (0, 0, 0)
+
+    def after(self, ms, func=None, *args):
+        self._timerCount += 1
+        id = "after#{}".format(self._timerCount)
+        self._timers[id] = (time.monotonic() + ms / 1000.0, func, args)
+        return id
+
+    def after_cancel(self, id):
+        self._timers.pop(id, None)
+
+    def wait_variable(self, name=None):
+        # Deliver the next queued input event instead of blocking
+        if not self._events:
+            raise GraphicsError("no input queued for headless window")
+        self.__dispatch(self._events.popleft())
+
+    def wait_window(self, window=None):
+        # Deliver queued input events until none are left or the window closes
+        while self._events and not self.closed:
+            self.__dispatch(self._events.popleft())
+
+    def __dispatch(self, event):
+        kind, args = event
+        if kind == "click":
+            self.click(*args)
+        else:
+            self.key(*args)
+
+    def click(self, x, y):
+        """Click at (x,y) in window coordinates now"""
+        xs, ys = self.toScreen(x, y)
+        self._onClick(_HeadlessEvent(xs, ys))
+
+    def key(self, keysym):
+        """Press the key named keysym now"""
+        self._onKey(_HeadlessEvent(keysym=keysym))
+
+    def queueClick(self, x, y):
+        """Queue a click at (x,y) in window coordinates"""
+        self._events.append(("click", (x, y)))
+
+    def queueKey(self, keysym):
+        """Queue a key press"""
+        self._events.append(("key", (keysym,)))
+
+    def save(self, filename):
+        """Render the window into a PNG file"""
+        with self.scene.timed("save"):
+            self.scene.savePNG(filename)
+
+
+class ClickRegion:
+
+    """A rectangle of a GraphWin, in window coordinates, whose clicks are
+    passed to handler(p). Made by GraphWin.addClickRegion"""
+
+    def __init__(self, win, handler, layer, order):
+        self.win = win
+        self.handler = handler
+        self.layer = layer
+        self.order = order
+        self.enabled = True
+        self.cells = []  # index cells the region is filed under
+        self.xmin = self.ymin = self.xmax = self.ymax = 0.0
+
+    def __repr__(self):
+        return "ClickRegion({}, {}, {}, {})".format(self.xmin, self.ymin, self.xmax, self.ymax)
+
+    def contains(self, x, y):
+        return self.xmin <= x <= self.xmax and self.ymin <= y <= self.ymax
+
+    def setBounds(self, x1, y1, x2, y2):
+        """Move the region to the rectangle with corners (x1,y1), (x2,y2)"""
+        self.xmin, self.xmax = min(x1, x2), max(x1, x2)
+        self.ymin, self.ymax = min(y1, y2), max(y1, y2)
+        self.win._index(self)
+
+    def move(self, dx, dy):
+        self.setBounds(self.xmin + dx, self.ymin + dy, self.xmax + dx, self.ymax + dy)
+
+    def setEnabled(self, enabled):
+        """Disabled regions let clicks through to whatever is below"""
+        self.enabled = enabled
+
+    def remove(self):
+        self.win.removeClickRegion(self)
+
                       
 class Transform:
 
@@ -301,6 +801,64 @@ class Transform:
         y = self.ybase - ys*self.yscale
         return x,y
 
+    def screenPoints(self, xs, ys):
+        # screen() for many points. NumPy arrays are converted in one
+        # vectorized step and give int arrays; sequences give lists
+        if _isArray(xs) or _isArray(ys):
+            xs = (np.asarray(xs, dtype=float) - self.xbase) / self.xscale
+            ys = (self.ybase - np.asarray(ys, dtype=float)) / self.yscale
+            return (np.trunc(xs + 0.5).astype(np.int64),
+                    np.trunc(ys + 0.5).astype(np.int64))
+        xbase, xscale = self.xbase, self.xscale
+        ybase, yscale = self.ybase, self.yscale
+        return ([int((x-xbase)/xscale + 0.5) for x in xs],
+                [int((ybase-y)/yscale + 0.5) for y in ys])
+
+    def worldPoints(self, xs, ys):
+        # world() for many points, like screenPoints
+        if _isArray(xs) or _isArray(ys):
+            return (np.asarray(xs, dtype=float) * self.xscale + self.xbase,
+                    self.ybase - np.asarray(ys, dtype=float) * self.yscale)
+        xbase, xscale = self.xbase, self.xscale
+        ybase, yscale = self.ybase, self.yscale
+        return ([x*xscale + xbase for x in xs], [ybase - y*yscale for y in ys])
+
+
+def _isArray(values):
+    # Internal helper: True for a NumPy array
+    return np is not None and isinstance(values, np.ndarray)
+
+def _pixelBlock(width, height, xs, ys, rgb):
+    # Internal helper for plotPixels. Returns (x0, y0, w, h, rgba) for the
+    # smallest block holding every pixel inside the window, with those
+    # pixels set to rgb and the rest transparent, or None if none are inside
+    pixel = bytes(rgb) + b"\xff"
+    if _isArray(xs) or _isArray(ys):
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        inside = (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+        xs, ys = xs[inside], ys[inside]
+        if not len(xs):
+            return None
+        x0, y0 = int(xs.min()), int(ys.min())
+        w, h = int(xs.max()) - x0 + 1, int(ys.max()) - y0 + 1
+        block = np.zeros((h, w, 4), dtype=np.uint8)
+        block[ys - y0, xs - x0] = np.frombuffer(pixel, dtype=np.uint8)
+        return x0, y0, w, h, block.tobytes()
+    points = [(int(x), int(y)) for x, y in zip(xs, ys)
+              if 0 <= x < width and 0 <= y < height]
+    if not points:
+        return None
+    x0 = min(x for x, y in points)
+    y0 = min(y for x, y in points)
+    w = max(x for x, y in points) - x0 + 1
+    h = max(y for x, y in points) - y0 + 1
+    block = bytearray(4 * w * h)
+    for x, y in points:
+        i = 4 * ((y - y0) * w + x - x0)
+        block[i:i + 4] = pixel
+    return x0, y0, w, h, block
+
 
 # Default values for various item configuration options. Only a subset of
 #   keys may be present in the configuration dictionary for a given item
@@ -339,6 +897,12 @@ class GraphicsObject:
         """Set line weight to width"""
         self._reconfig("width", width)
 
+    def setTag(self, tag):
+        """Give the object a Tk tag, so its window can show, hide or raise
+        all objects with the tag in one call. Call this before drawing"""
+        if self.canvas and not self.canvas.isClosed(): raise GraphicsError(OBJ_ALREADY_DRAWN)
+        self.config["tags"] = tag
+
     def draw(self, graphwin):
 
         """Draw the object in graphwin, which should be a GraphWin
@@ -352,7 +916,7 @@ class GraphicsObject:
         self.id = self._draw(graphwin, self.config)
         graphwin.addItem(self)
         if graphwin.autoflush:
-            _root.update()
+            graphwin.update()
         return self
 
             
@@ -366,7 +930,7 @@ class GraphicsObject:
             self.canvas.delete(self.id)
             self.canvas.delItem(self)
             if self.canvas.autoflush:
-                _root.update()
+                self.canvas.update()
         self.canvas = None
         self.id = None
 
@@ -388,7 +952,7 @@ class GraphicsObject:
                 y = dy
             self.canvas.move(self.id, x, y)
             if canvas.autoflush:
-                _root.update()
+                canvas.update()
            
     def _reconfig(self, option, setting):
         # Internal method for changing configuration of the object
@@ -399,9 +963,12 @@ class GraphicsObject:
         options = self.config
         options[option] = setting
         if self.canvas and not self.canvas.isClosed():
+            if self.canvas._batchDepth:
+                self.canvas._markDirty(self)
+                return
             self.canvas.itemconfig(self.id, options)
             if self.canvas.autoflush:
-                _root.update()
+                self.canvas.update()
 
 
     def _draw(self, canvas, options):
@@ -459,6 +1026,19 @@ class _BBox(GraphicsObject):
     def getP1(self): return self.p1.clone()
 
     def getP2(self): return self.p2.clone()
+
+    def setPoints(self, p1, p2):
+        """Move the corners to p1 and p2, changing the drawn item in place
+        rather than undrawing and redrawing it"""
+        self.p1 = p1.clone()
+        self.p2 = p2.clone()
+        canvas = self.canvas
+        if canvas and not canvas.isClosed():
+            x1,y1 = canvas.toScreen(p1.x,p1.y)
+            x2,y2 = canvas.toScreen(p2.x,p2.y)
+            canvas.coords(self.id, x1, y1, x2, y2)
+            if canvas.autoflush:
+                canvas.update()
     
     def getCenter(self):
         p1 = self.p1
@@ -581,13 +1161,11 @@ class Polygon(GraphicsObject):
             p.move(dx,dy)
    
     def _draw(self, canvas, options):
-        args = [canvas]
-        for p in self.points:
-            x,y = canvas.toScreen(p.x,p.y)
-            args.append(x)
-            args.append(y)
+        xs, ys = canvas.toScreenPoints([p.x for p in self.points],
+                                       [p.y for p in self.points])
+        args = [c for xy in zip(xs, ys) for c in xy]
         args.append(options)
-        return GraphWin.create_polygon(*args) 
+        return canvas.create_polygon(*args)
 
 class Text(GraphicsObject):
     
@@ -655,7 +1233,7 @@ class Entry(GraphicsObject):
         self.anchor = p.clone()
         #print self.anchor
         self.width = width
-        self.text = tk.StringVar(_root)
+        self.text = tk.StringVar(_getRoot())
         self.text.set("")
         self.fill = "gray"
         self.color = "black"
@@ -740,16 +1318,19 @@ class Image(GraphicsObject):
     idCount = 0
     imageCache = {} # tk photoimages go here to avoid GC while drawn 
     
-    def __init__(self, p, *pixmap):
+    def __init__(self, p, *pixmap, headless=None):
+        # headless picks where the pixels live: True for the headless
+        # backend, False for Tk, None for the current backend. An image
+        # drawn in a window of the other kind is copied to match it.
         GraphicsObject.__init__(self, [])
         self.anchor = p.clone()
         self.imageId = Image.idCount
         Image.idCount = Image.idCount + 1
         if len(pixmap) == 1: # file name provided
-            self.img = tk.PhotoImage(file=pixmap[0], master=_root)
+            self.img = _makePhoto(headless, file=pixmap[0])
         else: # width and height provided
             width, height = pixmap
-            self.img = tk.PhotoImage(master=_root, width=width, height=height)
+            self.img = _makePhoto(headless, width=width, height=height)
 
     def __repr__(self):
         return "Image({}, {}, {})".format(self.anchor, self.getWidth(), self.getHeight())
@@ -757,6 +1338,7 @@ class Image(GraphicsObject):
     def _draw(self, canvas, options):
         p = self.anchor
         x,y = canvas.toScreen(p.x,p.y)
+        self.img = _photoFor(self.img, canvas.headless)
         self.imageCache[self.imageId] = self.img # save a reference  
         return canvas.create_image(x,y,image=self.img)
     
@@ -804,6 +1386,65 @@ class Image(GraphicsObject):
         """Sets pixel (x,y) to the given color"""
         self.img.put("{" + color +"}", (x, y))
 
+    def setPixels(self, rows, x=0, y=0):
+        """Sets a block of pixels in a single call. rows is a list of rows,
+        each a list of color strings; the block's top-left is at (x,y)"""
+        data = " ".join("{" + " ".join(row) + "}" for row in rows)
+        self.img.put(data, (x, y))
+
+    def getPixels(self, asArray=False):
+        """Returns every pixel as RGB bytes (a bytearray, row by row), read
+        from the image in one call. With asArray=True returns a NumPy
+        uint8 array of shape (height, width, 3) instead"""
+        rgb = _photoRGB(self.img)
+        if asArray:
+            return np.frombuffer(rgb, dtype=np.uint8).reshape(
+                self.getHeight(), self.getWidth(), 3)
+        return rgb
+
+    def putPixels(self, pixels, x=0, y=0, width=None):
+        """Copies a block of pixels into the image in a single call, with
+        the block's top-left at (x,y). pixels is a NumPy uint8 array of
+        shape (h, w, 3) or (h, w, 4), or RGB bytes (bytes, bytearray or
+        memoryview) holding rows of width pixels, by default the image
+        width. Alpha in four-channel arrays is kept as transparency"""
+        if _isArray(pixels):
+            if pixels.ndim != 3 or pixels.shape[2] not in (3, 4):
+                raise GraphicsError(BAD_OPTION)
+            height, width, channels = pixels.shape
+            raw = np.ascontiguousarray(pixels, dtype=np.uint8).tobytes()
+        else:
+            raw = bytes(memoryview(pixels).cast("B"))
+            width = width or self.getWidth()
+            channels = 3
+            height = len(raw) // (3 * width)
+            if len(raw) != 3 * width * height:
+                raise GraphicsError(BAD_OPTION)
+        if not width or not height:
+            return
+        if channels == 3:
+            data = b"P6\n%d %d\n255\n" % (width, height) + raw
+        else:
+            import scene
+            data = scene.encodePNG(width, height, raw, alpha=True)
+        self.img.put(data, (x, y))
+
+    def fillRect(self, x1, y1, x2, y2, color):
+        """Sets every pixel with x1 <= x < x2 and y1 <= y < y2 to color"""
+        self.img.put(color, (x1, y1, x2, y2))
+
+    def setImage(self, other):
+        """Show the pixels of Image other in this one. The pixels are
+        shared, not copied, so swapping images is cheap"""
+        if self.canvas and not self.canvas.isClosed():
+            other.img = _photoFor(other.img, self.canvas.headless)
+        self.img = other.img
+        if self.canvas and not self.canvas.isClosed():
+            self.imageCache[self.imageId] = self.img
+            self.canvas.itemconfig(self.id, image=self.img)
+            if self.canvas.autoflush:
+                self.canvas.update()
+
     def save(self, filename):
         """Saves the pixmap image to filename.
         The format for the save image is determined from the filname extension."""
@@ -812,6 +1453,46 @@ class Image(GraphicsObject):
         ext = name.split(".")[-1]
         self.img.write( filename, format=ext)
 
+
+def _photoRGB(img):
+    # Internal helper reading all of a photo's pixels as RGB bytes
+    if not isinstance(img, tk.PhotoImage):
+        return img.rgb()  # headless scene.Photo
+    rows = img.tk.call(img.name, "data")
+    if not isinstance(rows, str):
+        rows = " ".join(rows)
+    return bytearray.fromhex(rows.replace("#", "").replace("{", "").replace("}", ""))
+
+        
+class ImageCache:
+
+    """A bounded cache of Images, dropping the least recently used one
+    when full. Useful for sprites that are rendered once and reused."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.images = OrderedDict()
+
+    def __len__(self):
+        return len(self.images)
+
+    def get(self, key, factory):
+        """Return the Image stored under key, calling factory() to create
+        it if it is not cached"""
+        try:
+            self.images.move_to_end(key)
+            return self.images[key]
+        except KeyError:
+            pass
+        image = factory()
+        self.images[key] = image
+        if len(self.images) > self.maxsize:
+            self.images.popitem(last=False)
+        return image
+
+    def clear(self):
+        self.images.clear()
+
         
 def color_rgb(r,g,b):
     """r,g,b are intensities of red, green, and blue in range(256)
@@ -862,7 +1543,5 @@ def test():
     win.getMouse()
     win.close()
 
-update()
-
 if __name__ == "__main__":
     test()
\ No newline at end of file
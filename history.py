@@ -0,0 +1,240 @@
+"""Compact, append-only roll history on disk.
+
+A log file is a 16 byte header followed by fixed-width little-endian
+records, one per roll:
+
+    timestamp  float64   seconds since the epoch
+    dice       uint16    number of dice rolled
+    sides      uint32    sides on each die
+    faces      max_dice faces, each 1, 2 or 4 bytes; unused slots are 0
+
+max_dice and the face width are fixed when a log is created and stored in
+the header. Because every record has the same size, read() can map a log
+into memory and hand it to NumPy as a structured array without copying
+or parsing anything, and analytics can walk it in chunks at disk speed.
+
+    with history.RollLog("rolls.log") as log:
+        log.append([3, 5], 6)
+
+    view = history.read("rolls.log")
+    for chunk in view.chunks():
+        totals = chunk["faces"].sum(axis=1)
+"""
+
+import mmap
+import os
+import struct
+import time
+from collections import namedtuple
+
+try:  # NumPy gives zero-copy structured views of a log
+    import numpy as np
+except ImportError:
+    np = None
+
+MAGIC = b"ROLLLOG\0"
+VERSION = 1
+_HEADER = struct.Struct("<8sHHI")  # magic, version, face bytes, max dice
+
+# Most dice a log can hold per roll; a record's dice field is a uint16
+MAX_DICE = 0xFFFF
+
+# Struct codes for each face width
+_FACE_CODES = {1: "B", 2: "H", 4: "I"}
+
+# Default records per chunk for LogView.chunks
+CHUNK_RECORDS = 1 << 16
+
+# Bytes buffered by RollLog before they are written out
+BUFFER_BYTES = 1 << 16
+
+Roll = namedtuple("Roll", "timestamp sides faces")
+
+
+def _face_bytes(max_sides):
+    # Smallest face width that holds max_sides
+    for size in sorted(_FACE_CODES):
+        if max_sides < 1 << (8 * size):
+            return size
+    raise ValueError("max_sides is too large")
+
+
+def _record_struct(face_bytes, max_dice):
+    return struct.Struct("<dHI{}{}".format(max_dice, _FACE_CODES[face_bytes]))
+
+
+def _read_header(f):
+    # Return (face_bytes, max_dice) from an open log file
+    header = f.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise ValueError("not a roll log: file is too short")
+    magic, version, face_bytes, max_dice = _HEADER.unpack(header)
+    if magic != MAGIC or face_bytes not in _FACE_CODES or not 1 <= max_dice <= MAX_DICE:
+        raise ValueError("not a roll log")
+    if version != VERSION:
+        raise ValueError("unsupported roll log version {}".format(version))
+    return face_bytes, max_dice
+
+
+def record_dtype(face_bytes, max_dice):
+    """NumPy dtype of one record of a log with this layout"""
+    if np is None:
+        raise ImportError("record_dtype requires numpy")
+    return np.dtype([("timestamp", "<f8"), ("dice", "<u2"), ("sides", "<u4"),
+                     ("faces", "<u{}".format(face_bytes), (max_dice,))])
+
+
+class RollLog:
+    """Appends rolls to a log file, creating it if needed.
+
+    A new log holds up to max_dice dice per roll with up to max_sides sides.
+    An existing log keeps the layout it was created with. Records are
+    buffered and written in blocks; call flush() or close() (or use the log
+    as a context manager) to make sure they reach the file."""
+
+    def __init__(self, path, max_dice=60, max_sides=255):
+        self.path = path
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self.file = open(path, "r+b")
+            self.face_bytes, self.max_dice = _read_header(self.file)
+            self.record = _record_struct(self.face_bytes, self.max_dice)
+            # drop a partial record left by an interrupted write
+            count = (os.path.getsize(path) - _HEADER.size) // self.record.size
+            self.file.truncate(_HEADER.size + count * self.record.size)
+            self.file.seek(0, os.SEEK_END)
+        else:
+            if not 1 <= max_dice <= MAX_DICE:
+                raise ValueError("max_dice must be between 1 and {}".format(MAX_DICE))
+            self.face_bytes, self.max_dice = _face_bytes(max_sides), max_dice
+            self.record = _record_struct(self.face_bytes, max_dice)
+            self.file = open(path, "wb")
+            self.file.write(_HEADER.pack(MAGIC, VERSION, self.face_bytes, max_dice))
+            count = 0
+        self.max_sides = (1 << (8 * self.face_bytes)) - 1
+        self.count = count
+        self.buffer = bytearray()
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _check(self, num_dice, sides):
+        if num_dice > self.max_dice:
+            raise ValueError("log holds at most {} dice per roll".format(self.max_dice))
+        if not 1 <= sides <= self.max_sides:
+            raise ValueError("log holds dice with 1 to {} sides".format(self.max_sides))
+
+    def append(self, faces, sides, timestamp=None):
+        """Record one roll of dice with the given sides"""
+        faces = list(faces)
+        self._check(len(faces), sides)
+        if timestamp is None:
+            timestamp = time.time()
+        padding = [0] * (self.max_dice - len(faces))
+        self.buffer += self.record.pack(timestamp, len(faces), sides, *(faces + padding))
+        self.count += 1
+        if len(self.buffer) >= BUFFER_BYTES:
+            self.flush()
+
+    def extend(self, faces, sides, timestamps=None):
+        """Record many rolls of the same pool at once. faces is a 2-D NumPy
+        array with one row per roll, as from engine.roll_array; timestamps
+        is an array of one timestamp per row, or None for now"""
+        if np is None:
+            raise ImportError("extend requires numpy")
+        faces = np.asarray(faces)
+        num_rolls, num_dice = faces.shape
+        self._check(num_dice, sides)
+        records = np.zeros(num_rolls, dtype=record_dtype(self.face_bytes, self.max_dice))
+        records["timestamp"] = time.time() if timestamps is None else timestamps
+        records["dice"] = num_dice
+        records["sides"] = sides
+        records["faces"][:, :num_dice] = faces
+        self.flush()
+        self.file.write(records.tobytes())
+        self.count += num_rolls
+
+    def flush(self):
+        """Write buffered records to the file"""
+        if self.buffer:
+            self.file.write(self.buffer)
+            self.buffer = bytearray()
+        self.file.flush()
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+class LogView:
+    """Read-only, memory-mapped view of the rolls in a log when it was
+    opened. Made by read()"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.face_bytes, self.max_dice = _read_header(f)
+            self.record = _record_struct(self.face_bytes, self.max_dice)
+            self.count = (os.fstat(f.fileno()).st_size - _HEADER.size) // self.record.size
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def records(self, start=0, stop=None):
+        """NumPy structured array of records start to stop, sharing memory
+        with the mapped file. Fields: timestamp, dice, sides, faces"""
+        if np is None:
+            raise ImportError("records requires numpy")
+        start, stop, _ = slice(start, stop).indices(self.count)
+        stop = max(start, stop)
+        return np.frombuffer(self._map(), dtype=record_dtype(self.face_bytes, self.max_dice),
+                             count=stop - start, offset=_HEADER.size + start * self.record.size)
+
+    def chunks(self, size=CHUNK_RECORDS):
+        """Yield the records in consecutive arrays of at most size records"""
+        for start in range(0, self.count, size):
+            yield self.records(start, start + size)
+
+    def __iter__(self):
+        # Works without NumPy, one Roll at a time
+        body = memoryview(self._map())[_HEADER.size:_HEADER.size + self.count * self.record.size]
+        try:
+            for record in self.record.iter_unpack(body):
+                timestamp, num_dice, sides = record[:3]
+                yield Roll(timestamp, sides, record[3:3 + num_dice])
+        finally:
+            body.release()
+
+    def _map(self):
+        if self.map is None:
+            raise ValueError("roll log view is closed")
+        return self.map
+
+    def close(self):
+        """Release the mapping. Arrays from records() or chunks() that are
+        still alive keep it mapped until they are garbage collected"""
+        if self.map is None:
+            return
+        try:
+            self.map.close()
+        except BufferError:
+            pass  # unmapped when the last array using it goes away
+        self.map = None
+
+
+def read(path):
+    """Open a log for reading; returns a LogView"""
+    return LogView(path)
@@ -0,0 +1,199 @@
+"""Dice notation such as "4d6kh3+2" or "2d8!+1d6-1".
+
+An expression is a sum of terms separated by + or -. Each term is either
+a whole number or a dice pool written NdS, where N defaults to 1 and S may
+be % for a hundred-sided die. A pool can be followed by:
+
+    !       exploding: a die showing its highest face is rolled again and
+            the new roll added to it
+    khN     keep the N highest dice (k is short for kh)
+    klN     keep the N lowest dice
+    dhN     drop the N highest dice
+    dlN     drop the N lowest dice
+
+parse() turns the text into a Plan once and caches it, so the same
+expression can be rolled over and over without being parsed again.
+"""
+
+import re
+from functools import lru_cache
+
+import engine
+import randomness
+
+try:  # NumPy is only needed for Plan.roll_array
+    import numpy as np
+except ImportError:
+    np = None
+
+# An exploding die stops after this many extra rolls
+MAX_EXPLOSIONS = 100
+
+_TERM = re.compile(r"""
+    \s*(?P<sign>[+-])?\s*
+    (?:
+        (?P<count>\d*)d(?P<sides>\d+|%)
+        \s*(?P<explode>!)?
+        \s*(?:(?P<keep>kh|kl|dh|dl|k)(?P<n>\d*))?
+      | (?P<number>\d+)
+    )\s*
+""", re.VERBOSE | re.IGNORECASE)
+
+
+class NotationError(ValueError):
+    """Raised for text that is not valid dice notation."""
+    pass
+
+
+class Pool:
+    """A group of identical dice that are rolled and summed together"""
+
+    def __init__(self, count, sides, explode=False, keep=None, n=1):
+        if sides < 1:
+            raise NotationError("dice need at least 1 side")
+        if explode and sides == 1:
+            raise NotationError("a 1-sided die cannot explode")
+        self.count = count
+        self.sides = sides
+        self.explode = explode
+        self.keep = keep
+        self.n = n
+        # the dice that count are sorted_faces[lo:hi]
+        n = min(n, count)
+        self.lo, self.hi = {
+            None: (0, count),
+            "kh": (count - n, count),
+            "kl": (0, n),
+            "dh": (0, count - n),
+            "dl": (n, count),
+        }[keep]
+
+    def __str__(self):
+        text = "{}d{}".format(self.count, self.sides)
+        if self.explode:
+            text += "!"
+        if self.keep:
+            text += "{}{}".format(self.keep, self.n)
+        return text
+
+    def roll(self, rng=None):
+        """Roll the pool and return the faces that count"""
+        source = randomness.get(rng)
+        faces = engine.roll(self.count, self.sides, source)
+        if self.explode:
+            faces = [self._explode(face, source) for face in faces]
+        if self.keep:
+            faces = sorted(faces)[self.lo:self.hi]
+        return faces
+
+    def _explode(self, face, source):
+        # keep rolling while the newest roll shows the highest face
+        total = face
+        for _ in range(MAX_EXPLOSIONS):
+            if face != self.sides:
+                break
+            face = engine.roll_die(self.sides, source)
+            total += face
+        return total
+
+    def roll_array(self, num_rolls, rng=None):
+        """Roll the pool num_rolls times and return a NumPy array of totals"""
+        rng = randomness.get(rng, "pcg64")
+        faces = engine.roll_array(num_rolls, self.count, self.sides, rng).astype(np.int64)
+        if self.explode:
+            last = faces == self.sides
+            for _ in range(MAX_EXPLOSIONS):
+                if not last.any():
+                    break
+                extra = engine.roll_array(int(last.sum()), 1, self.sides, rng)[:, 0]
+                faces[last] += extra
+                last[last] = extra == self.sides
+        if self.keep:
+            faces = np.sort(faces, axis=1)[:, self.lo:self.hi]
+        return faces.sum(axis=1)
+
+
+class Plan:
+    """A parsed dice expression that can be rolled many times"""
+
+    def __init__(self, terms):
+        # terms is a list of (sign, Pool) pairs; constants are folded
+        # into a single modifier
+        self.pools = [(sign, term) for sign, term in terms if isinstance(term, Pool)]
+        self.modifier = sum(sign * term for sign, term in terms if not isinstance(term, Pool))
+
+    def __str__(self):
+        text = ""
+        for sign, pool in self.pools:
+            if text or sign < 0:
+                text += "+" if sign > 0 else "-"
+            text += str(pool)
+        if self.modifier or not text:
+            if text and self.modifier >= 0:
+                text += "+"
+            text += str(self.modifier)
+        return text
+
+    def __repr__(self):
+        return "Plan('{}')".format(self)
+
+    def roll(self, rng=None):
+        """Roll the expression once and return the total"""
+        source = randomness.get(rng)
+        total = self.modifier
+        for sign, pool in self.pools:
+            total += sign * sum(pool.roll(source))
+        return total
+
+    def roll_many(self, num_rolls, rng=None):
+        """Roll the expression num_rolls times and return a list of totals"""
+        source = randomness.get(rng)
+        return [self.roll(source) for _ in range(num_rolls)]
+
+    def roll_array(self, num_rolls, rng=None):
+        """Roll the expression num_rolls times with NumPy and return an
+        int64 array of totals"""
+        if np is None:
+            raise ImportError("Plan.roll_array requires numpy")
+        rng = randomness.get(rng, "pcg64")
+        totals = np.full(num_rolls, self.modifier, dtype=np.int64)
+        for sign, pool in self.pools:
+            if sign > 0:
+                totals += pool.roll_array(num_rolls, rng)
+            else:
+                totals -= pool.roll_array(num_rolls, rng)
+        return totals
+
+
+@lru_cache(maxsize=1024)
+def parse(text):
+    """Parse dice notation and return a Plan. Results are cached, so
+    parsing the same text again is a dictionary lookup"""
+    terms = []
+    pos = 0
+    while pos < len(text) or not terms:
+        match = _TERM.match(text, pos)
+        if not match or match.end() == pos:
+            raise NotationError("invalid dice notation at position {}: {!r}".format(pos, text))
+        if terms and not match.group("sign"):
+            raise NotationError("expected + or - at position {}: {!r}".format(pos, text))
+        sign = -1 if match.group("sign") == "-" else 1
+        if match.group("number") is not None:
+            terms.append((sign, int(match.group("number"))))
+        else:
+            count = int(match.group("count") or 1)
+            sides = match.group("sides")
+            sides = 100 if sides == "%" else int(sides)
+            keep = match.group("keep")
+            keep = keep.lower() if keep else None
+            if keep == "k":
+                keep = "kh"
+            n = int(match.group("n") or 1)
+            terms.append((sign, Pool(count, sides, bool(match.group("explode")), keep, n)))
+        pos = match.end()
+    return Plan(terms)
+
+
+def roll(text, rng=None):
+    """Roll a dice expression once and return the total"""
+    return parse(text).roll(rng)
@@ -0,0 +1,110 @@
+from graphics import *
+from buttons import Button
+
+# Bars in the histogram of totals
+NUM_BARS = 30
+
+
+class StatsPanel:
+    """Shows the running statistics of a stats.RollStats: rolls, mean,
+    variance, min/max and a histogram of totals.
+
+    Every item is drawn once. refresh() only changes text and resizes the
+    existing histogram bars, so its cost is the same after a million rolls
+    as after one."""
+
+    def __init__(self, win, p1, p2, stats):
+        """Create the panel
+        Parameters:
+            win: the GraphWin to draw on
+            p1, p2: opposite corners of the panel
+            stats: the RollStats to show
+        """
+        self.win = win
+        self.stats = stats
+        xmin, xmax = min(p1.getX(), p2.getX()), max(p1.getX(), p2.getX())
+        ymin, ymax = min(p1.getY(), p2.getY()), max(p1.getY(), p2.getY())
+        self.text_color = "#495057"
+
+        background = Rectangle(Point(xmin, ymin), Point(xmax, ymax))
+        background.setFill("#F8F9FA")
+        background.setOutline("#DEE2E6")
+        background.draw(win)
+
+        title = Text(Point((xmin + xmax) / 2.0, ymax - 0.4), "STATISTICS")
+        title.setSize(12)
+        title.setStyle("bold")
+        title.setTextColor(self.text_color)
+        title.draw(win)
+
+        # Button that starts and stops auto-rolling; the roller sets its command
+        self.auto_button = Button(win, Point((xmin + xmax) / 2.0, ymax - 1.1),
+                                  1.6, 0.5, "AUTO")
+        self.auto_button.activate()
+
+        # One line of text per statistic
+        self.lines = []
+        for i in range(4):
+            line = Text(Point((xmin + xmax) / 2.0, ymax - 1.9 - 0.45 * i), "")
+            line.setSize(11)
+            line.setTextColor(self.text_color)
+            self.lines.append(line)
+
+        # Histogram bars, resized in place by refresh()
+        self.left, self.right = xmin + 0.3, xmax - 0.3
+        self.base, self.top = ymin + 0.6, ymax - 3.9
+        self.bars = []
+        for i in range(NUM_BARS):
+            bar = Rectangle(Point(self.left, self.base), Point(self.left, self.base))
+            bar.setFill("#3498DB")
+            bar.setOutline("#2980B9")
+            self.bars.append(bar)
+        self.low_label = Text(Point(self.left, ymin + 0.3), "")
+        self.high_label = Text(Point(self.right, ymin + 0.3), "")
+        for label in (self.low_label, self.high_label):
+            label.setSize(9)
+            label.setTextColor(self.text_color)
+
+        with win.batch():
+            for item in self.lines + self.bars + [self.low_label, self.high_label]:
+                item.draw(win)
+        self.refresh()
+
+    def refresh(self):
+        """Show the current statistics"""
+        stats = self.stats
+        with self.win.batch():
+            if stats.count:
+                text = ["Rolls: {:,}".format(stats.count),
+                        "Mean: {:.3f}".format(stats.mean),
+                        "Variance: {:.3f}".format(stats.variance()),
+                        "Min / Max: {} / {}".format(stats.min, stats.max)]
+            else:
+                text = ["Rolls: 0", "Mean: -", "Variance: -", "Min / Max: -"]
+            for line, value in zip(self.lines, text):
+                if line.getText() != value:
+                    line.setText(value)
+            self.__drawHistogram()
+
+    def __drawHistogram(self):
+        # Group the totals from min to max into at most NUM_BARS bins, then
+        # spread the bins over the width with heights relative to the
+        # tallest. Bars without a bin shrink to nothing
+        stats = self.stats
+        bins = []
+        if stats.count:
+            low, high = stats.min, stats.max
+            per_bar = -(-(high - low + 1) // NUM_BARS)
+            bins = [sum(stats.counts[t:t + per_bar]) for t in range(low, high + 1, per_bar)]
+            self.low_label.setText(str(low))
+            self.high_label.setText(str(high))
+        width = (self.right - self.left) / max(len(bins), 1)
+        scale = (self.top - self.base) / max(bins or [1])
+        for i, bar in enumerate(self.bars):
+            if i < len(bins):
+                x = self.left + i * width
+                p1, p2 = Point(x, self.base), Point(x + width, self.base + bins[i] * scale)
+            else:
+                p1 = p2 = Point(self.left, self.base)
+            if (bar.p1.x, bar.p2.x, bar.p2.y) != (p1.x, p2.x, p2.y):
+                bar.setPoints(p1, p2)
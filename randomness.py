@@ -0,0 +1,185 @@
+"""Random number sources for the roll engine.
+
+Every roll API in engine.py and notation.py takes an optional rng argument,
+which may be:
+
+    None            the calling thread's own stream of the default kind
+    a kind name     "python", "pcg64", "philox" or "secrets"; the calling
+                    thread's own stream of that kind
+    a source        a PythonRNG, NumpyRNG or SystemRNG instance
+    a Generator     a numpy.random.Generator, used as is
+
+Thread streams are derived from one root seed, so threads never share
+generator state and need no locks. Call seed() to make the thread streams
+reproducible, or build seeded sources and spawn() independent children for
+each worker.
+"""
+
+import hashlib
+import itertools
+import random
+import secrets
+import threading
+
+try:  # NumPy backs the pcg64 and philox sources but is optional
+    import numpy as np
+except ImportError:
+    np = None
+
+KINDS = ("python", "pcg64", "philox", "secrets")
+
+_root_entropy = secrets.randbits(128)
+_stream_numbers = itertools.count()
+_generation = 0
+_local = threading.local()
+
+
+class RandomSource:
+    """Base class for the random sources. Subclasses override randint,
+    faces and spawn"""
+
+    def randint(self, sides):
+        """Return a single face in 1..sides"""
+        pass # must override in subclass
+
+    def faces(self, count, sides):
+        """Return a list of count faces in 1..sides"""
+        pass # must override in subclass
+
+    def face_array(self, shape, sides, dtype):
+        """Return a NumPy array of the given shape filled with faces"""
+        if np is None:
+            raise ImportError("face arrays require numpy")
+        size = 1
+        for dim in shape:
+            size *= dim
+        return np.array(self.faces(size, sides), dtype=dtype).reshape(shape)
+
+    def spawn(self, n):
+        """Return a list of n independent child sources"""
+        pass # must override in subclass
+
+
+class PythonRNG(RandomSource):
+    """A seedable random.Random Mersenne Twister"""
+
+    def __init__(self, seed=None):
+        self.random = random.Random(seed)
+
+    def __repr__(self):
+        return "PythonRNG()"
+
+    def randint(self, sides):
+        return self.random.randrange(1, sides + 1)
+
+    def faces(self, count, sides):
+        return self.random.choices(range(1, sides + 1), k=count)
+
+    def spawn(self, n):
+        return [PythonRNG(self.random.getrandbits(128)) for _ in range(n)]
+
+
+class NumpyRNG(RandomSource):
+    """A NumPy Generator on a PCG64 or Philox bit generator. seed may be an
+    int, a numpy SeedSequence or an existing Generator"""
+
+    def __init__(self, seed=None, algorithm="pcg64"):
+        if np is None:
+            raise ImportError("NumpyRNG requires numpy")
+        if isinstance(seed, np.random.Generator):
+            self.generator = seed
+            algorithm = type(seed.bit_generator).__name__.lower()
+        else:
+            if not isinstance(seed, np.random.SeedSequence):
+                seed = np.random.SeedSequence(seed)
+            if algorithm == "pcg64":
+                bits = np.random.PCG64(seed)
+            elif algorithm == "philox":
+                bits = np.random.Philox(seed)
+            else:
+                raise ValueError("unknown algorithm: {}".format(algorithm))
+            self.generator = np.random.Generator(bits)
+        self.algorithm = algorithm
+
+    def __repr__(self):
+        return "NumpyRNG({!r})".format(self.algorithm)
+
+    def randint(self, sides):
+        return int(self.generator.integers(1, sides, endpoint=True))
+
+    def faces(self, count, sides):
+        return self.generator.integers(1, sides, size=count, endpoint=True).tolist()
+
+    def face_array(self, shape, sides, dtype):
+        return self.generator.integers(1, sides, size=shape, dtype=dtype, endpoint=True)
+
+    def spawn(self, n):
+        return [NumpyRNG(child, self.algorithm) for child in self.generator.spawn(n)]
+
+
+class SystemRNG(RandomSource):
+    """Cryptographic rolls from the operating system via secrets. There is
+    no state, so it cannot be seeded and is safe to share between threads"""
+
+    def __repr__(self):
+        return "SystemRNG()"
+
+    def randint(self, sides):
+        return secrets.randbelow(sides) + 1
+
+    def faces(self, count, sides):
+        randbelow = secrets.randbelow
+        return [randbelow(sides) + 1 for _ in range(count)]
+
+    def spawn(self, n):
+        return [self] * n
+
+
+_system = SystemRNG()
+
+
+def seed(value=None):
+    """Reseed the root of the per-thread streams. Each thread derives a new
+    stream on its next roll, numbered in the order threads first roll"""
+    global _root_entropy, _stream_numbers, _generation
+    _root_entropy = secrets.randbits(128) if value is None else value
+    _stream_numbers = itertools.count()
+    _generation += 1
+
+
+def _thread_source(kind):
+    # Internal helper returning the calling thread's source of this kind
+    if getattr(_local, "generation", None) != _generation:
+        _local.generation = _generation
+        _local.number = next(_stream_numbers)
+        _local.sources = {}
+    source = _local.sources.get(kind)
+    if source is None:
+        if kind == "python":
+            key = "{}:{}".format(_root_entropy, _local.number).encode()
+            source = PythonRNG(int.from_bytes(hashlib.sha256(key).digest(), "big"))
+        elif kind in ("pcg64", "philox"):
+            if np is None:
+                raise ImportError("the {} source requires numpy".format(kind))
+            sequence = np.random.SeedSequence(_root_entropy, spawn_key=(_local.number,))
+            source = NumpyRNG(sequence, kind)
+        elif kind == "secrets":
+            source = _system
+        else:
+            raise ValueError("unknown random source: {}".format(kind))
+        _local.sources[kind] = source
+    return source
+
+
+def get(rng=None, default="python"):
+    """Resolve an rng argument to a RandomSource. default is the kind used
+    when rng is None"""
+    if rng is None:
+        return _thread_source(default)
+    if isinstance(rng, RandomSource):
+        return rng
+    if isinstance(rng, str):
+        return _thread_source(rng)
+    if np is not None and isinstance(rng, np.random.Generator):
+        return NumpyRNG(rng)
+    raise TypeError("not a random source: {!r}".format(rng))
@@ -1,13 +1,40 @@
-from random import randrange
 from graphics import *
 from buttons import Button, Dropdown
-from die import DieView
+from tray import DiceTray
+from panel import StatsPanel
+from stats import RollStats
+import argparse
+import engine
+import history
 
+# Auto-rolling makes this many rolls per frame, and draws at most
+# FRAME_RATE frames a second
+AUTO_ROLLS = 100
+FRAME_RATE = 30
 
-def main():
-    # create application window with modern styling
-    win = GraphWin("Dice Roller", 600, 450)
-    win.setCoords(0, 0, 10, 10)
+
+def main(log_path=None, show_stats=False):
+    """Run the dice roller. If log_path is given, every roll is appended
+    to the history log there. show_stats adds a panel with live
+    statistics of the session's rolls and an AUTO button"""
+    dice_options = ["1", "2", "3", "4", "5", "10", "20", "60"]
+    sides_options = ["4", "6", "8", "10", "20"]
+    max_dice, max_sides = max(map(int, dice_options)), max(map(int, sides_options))
+
+    # Open the log first, so a log that cannot hold every pool is reported
+    # before the window opens rather than when a roll fails to be recorded
+    log = None
+    if log_path:
+        log = history.RollLog(log_path, max_dice, max_sides)
+        if log.max_dice < max_dice or log.max_sides < max_sides:
+            log.close()
+            raise ValueError("{} holds at most {} dice of {} sides; use another log"
+                             .format(log_path, log.max_dice, log.max_sides))
+
+    # create application window with modern styling; the statistics
+    # panel widens it to the right
+    win = GraphWin("Dice Roller", 900 if show_stats else 600, 450)
+    win.setCoords(0, 0, 15 if show_stats else 10, 10)
     win.setBackground("#2E3B4E")
     
     # Title of the app
@@ -23,9 +50,7 @@ def main():
     control_panel.setOutline("#DEE2E6")
     control_panel.draw(win)
     
-    dice_options = ["1", "2", "3", "4", "5"]
     dice_dropdown = Dropdown(win, Point(1.75, 8.125), 2, 0.75, dice_options, "Dice")
-    sides_options = ["4", "6", "8", "10", "20"]
     sides_dropdown = Dropdown(win, Point(8.25, 8.125), 2, 0.75, sides_options, "Sides")
     rollButton = Button(win, Point(5, 3), 1.35, 0.8, "ROLL")
     rollButton.activate()
@@ -37,23 +62,9 @@ def main():
     dice_container.setWidth(2)
     dice_container.draw(win)
     
-    # Initialize dice array
-    dice = []
-    max_dice = 5
-    
-    # Calculate positions for the dice (they'll be evenly spaced)
-    positions = []
-    for i in range(max_dice):
-        x_pos = 1.5 + (i * 1.75)
-        positions.append(Point(x_pos, 5.25))
-    
-    # Create the dice views with modern styling
-    for i in range(max_dice):
-        die = DieView(win, positions[i], 1.5)
-        # Initially hide dice beyond the first 2
-        if i >= 2:
-            die.hide()
-        dice.append(die)
+    # Tray that lays out any number of dice, a page at a time
+    tray = DiceTray(win, Point(0.5, 4), Point(9.5, 6.5), 1.5)
+    tray.setValues([1, 1])
 
     # Create the total display with modern styling
     total_label = Text(Point(5, 2), "TOTAL")
@@ -71,41 +82,78 @@ def main():
     quitButton = Button(win, Point(9, 0.7), 1, 0.6, "✕")
     quitButton.activate()
 
-    # Event Loop
-    pt = win.getMouse()
-    while not quitButton.clicked(pt):
-        if rollButton.clicked(pt):
-            # Get the number of dice to roll
-            num_dice = dice_dropdown.get_value()
-            
-            # Get the number of sides on each die
-            sides = sides_dropdown.get_value()
-            
-            # Roll the dice and calculate total
-            total = 0
-            for i in range(max_dice):
-                if i < num_dice:
-                    # Show and roll dice that are active
-                    dice[i].show()
-                    value = randrange(1, sides + 1)
-                    dice[i].setValue(value)
-                    total += value
-                else:
-                    # Hide dice that aren't being used
-                    dice[i].hide()
+    # Running statistics, kept up to date in constant time per roll
+    stats = panel = None
+    if show_stats:
+        stats = RollStats(max_dice * max_sides)
+        panel = StatsPanel(win, Point(10.25, 0.4), Point(14.75, 8.75), stats)
+
+    def record(faces, sides):
+        # Keep one roll in the history and the statistics
+        if log is not None:
+            log.append(faces, sides)
+        if stats is not None:
+            stats.add(sum(faces))
+
+    def show(faces):
+        # Display the faces in a single screen update
+        with win.batch():
+            tray.setValues(faces)
             
             # Update total display
-            totalText.setText(str(total))
-            
-        # Check if dropdowns were clicked
-        dice_dropdown.clicked(pt)
-        sides_dropdown.clicked(pt)
+            totalText.setText(str(sum(faces)))
+            if panel is not None:
+                panel.refresh()
+
+    def roll_dice():
+        # Get the number of dice to roll
+        num_dice = dice_dropdown.get_value()
+        
+        # Get the number of sides on each die
+        sides = sides_dropdown.get_value()
         
-        # Get next mouse click
-        pt = win.getMouse()
+        # Roll the dice with the engine, then display the faces
+        faces = engine.roll(num_dice, sides)
+        record(faces, sides)
+        show(faces)
+
+    auto = False
+
+    def toggle_auto():
+        # Start or stop auto-rolling. While it runs, each frame makes
+        # AUTO_ROLLS rolls but draws only the last; update(FRAME_RATE)
+        # caps the frame rate and win.update() handles clicks (including
+        # the one that stops it), or runs due timers on a headless window
+        nonlocal auto
+        auto = not auto
+        panel.auto_button.label.setText("STOP" if auto else "AUTO")
+        while auto and win.isOpen():
+            num_dice, sides = dice_dropdown.get_value(), sides_dropdown.get_value()
+            for faces in engine.roll_many(AUTO_ROLLS, num_dice, sides):
+                record(faces, sides)
+            show(faces)
+            update(FRAME_RATE)
+            if win.isOpen():
+                win.update()
 
-    win.close()
+    # The window routes each click straight to the widget under it; open
+    # dropdown menus sit on top of everything else
+    rollButton.setCommand(roll_dice)
+    quitButton.setCommand(win.close)
+    if panel is not None:
+        panel.auto_button.setCommand(toggle_auto)
+    try:
+        win.run()
+    finally:
+        if log is not None:
+            log.close()
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Dice roller")
+    parser.add_argument("--stats", action="store_true",
+                        help="show live statistics of the session's rolls")
+    parser.add_argument("--log", metavar="PATH",
+                        help="append every roll to this history file")
+    args = parser.parse_args()
+    main(args.log, args.stats)
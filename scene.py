@@ -0,0 +1,474 @@
+"""In-memory scene used by the headless graphics backend.
+
+A Scene stands in for a Tk canvas. It records each item created on it
+along with the item's coordinates and options, and keeps the call count
+and total time for every canvas operation. render() rasterizes the
+scene in pure Python and savePNG() writes the result. Photo stands in
+for tk.PhotoImage and keeps its pixels in a bytearray.
+
+Nothing here imports tkinter, so it works without a display.
+"""
+
+import base64
+import struct
+import time
+import zlib
+from contextlib import contextmanager
+
+# Named colors understood by the rasterizer, besides #rgb and #rrggbb
+COLORS = {
+    "white": (255, 255, 255), "black": (0, 0, 0), "red": (255, 0, 0),
+    "green": (0, 128, 0), "blue": (0, 0, 255), "yellow": (255, 255, 0),
+    "cyan": (0, 255, 255), "magenta": (255, 0, 255), "orange": (255, 165, 0),
+    "purple": (128, 0, 128), "gray": (190, 190, 190), "grey": (190, 190, 190),
+    "lightgray": (211, 211, 211), "darkgray": (169, 169, 169), "brown": (165, 42, 42),
+    "pink": (255, 192, 203),
+}
+
+# 3x5 bitmaps used to draw text; lowercase letters use the uppercase glyph
+GLYPHS = {
+    "0": ("111", "101", "101", "101", "111"), "1": ("010", "110", "010", "010", "111"),
+    "2": ("111", "001", "111", "100", "111"), "3": ("111", "001", "111", "001", "111"),
+    "4": ("101", "101", "111", "001", "001"), "5": ("111", "100", "111", "001", "111"),
+    "6": ("111", "100", "111", "101", "111"), "7": ("111", "001", "001", "001", "001"),
+    "8": ("111", "101", "111", "101", "111"), "9": ("111", "101", "111", "001", "111"),
+    "A": ("010", "101", "111", "101", "101"), "B": ("110", "101", "110", "101", "110"),
+    "C": ("011", "100", "100", "100", "011"), "D": ("110", "101", "101", "101", "110"),
+    "E": ("111", "100", "110", "100", "111"), "F": ("111", "100", "110", "100", "100"),
+    "G": ("011", "100", "101", "101", "011"), "H": ("101", "101", "111", "101", "101"),
+    "I": ("111", "010", "010", "010", "111"), "J": ("001", "001", "001", "101", "010"),
+    "K": ("101", "101", "110", "101", "101"), "L": ("100", "100", "100", "100", "111"),
+    "M": ("101", "111", "111", "101", "101"), "N": ("110", "101", "101", "101", "101"),
+    "O": ("010", "101", "101", "101", "010"), "P": ("110", "101", "110", "100", "100"),
+    "Q": ("010", "101", "101", "110", "011"), "R": ("110", "101", "110", "101", "101"),
+    "S": ("011", "100", "010", "001", "110"), "T": ("111", "010", "010", "010", "010"),
+    "U": ("101", "101", "101", "101", "111"), "V": ("101", "101", "101", "101", "010"),
+    "W": ("101", "101", "111", "111", "101"), "X": ("101", "101", "010", "101", "101"),
+    "Y": ("101", "101", "010", "010", "010"), "Z": ("111", "001", "010", "100", "111"),
+    " ": ("000", "000", "000", "000", "000"), "-": ("000", "000", "111", "000", "000"),
+    "+": ("000", "010", "111", "010", "000"), ".": ("000", "000", "000", "000", "010"),
+    ":": ("000", "010", "000", "010", "000"), "(": ("010", "100", "100", "100", "010"),
+    ")": ("010", "001", "001", "001", "010"), "✕": ("101", "101", "010", "101", "101"),
+    "▼": ("000", "111", "111", "010", "000"), "▲": ("000", "010", "111", "111", "000"),
+    "<": ("001", "010", "100", "010", "001"), ">": ("100", "010", "001", "010", "100"),
+}
+
+
+def parseColor(color):
+    """Return (r, g, b) for a Tk color string, or None for no color"""
+    if not color:
+        return None
+    if color[0] == "#":
+        digits = color[1:]
+        step = len(digits) // 3
+        if step in (1, 2, 4) and len(digits) == 3 * step:
+            scale = 255.0 / (16 ** step - 1)
+            return tuple(int(round(int(digits[i * step:(i + 1) * step], 16) * scale))
+                         for i in range(3))
+    return COLORS.get(color.lower().replace(" ", ""), (128, 128, 128))
+
+
+class Photo:
+    """Pixel buffer with the subset of the tk.PhotoImage interface that
+    graphics.Image uses. Pixels are RGBA bytes, row by row"""
+
+    def __init__(self, width=0, height=0, file=None, data=None, format=None):
+        # data is a PNG, as bytes or base64 text
+        if file is not None:
+            width, height, self.data = readPNG(file)
+        elif data is not None:
+            if isinstance(data, str):
+                data = base64.b64decode(data)
+            width, height, self.data = decodePNG(data)
+        else:
+            self.data = bytearray(4 * width * height)
+        self._width = width
+        self._height = height
+
+    def width(self):
+        return self._width
+
+    def height(self):
+        return self._height
+
+    def get(self, x, y):
+        i = 4 * (y * self._width + x)
+        return tuple(self.data[i:i + 3])
+
+    def put(self, data, to=None):
+        # data is a single color, "{c c ...} {c c ...}" rows of colors,
+        # or PNG or binary PPM bytes
+        x, y = (to or (0, 0))[:2]
+        if isinstance(data, (bytes, bytearray)):
+            decode = decodePNG if data.startswith(b"\x89PNG") else decodePPM
+            self.putBlock(x, y, *decode(data))
+            return
+        if not data.startswith("{") or (to and len(to) == 4):
+            x2, y2 = (to[2], to[3]) if to and len(to) == 4 else (x + 1, y + 1)
+            rgb = parseColor(data.strip("{}"))
+            pixel = bytes(rgb + (255,))
+            for row in range(max(y, 0), min(y2, self._height)):
+                start = 4 * (row * self._width + max(x, 0))
+                count = max(0, min(x2, self._width) - max(x, 0))
+                self.data[start:start + 4 * count] = pixel * count
+            return
+        for dy, row in enumerate(data[1:-1].split("} {")):
+            for dx, color in enumerate(row.split()):
+                self.putPixel(x + dx, y + dy, parseColor(color))
+
+    def putPixel(self, x, y, rgb):
+        if 0 <= x < self._width and 0 <= y < self._height and rgb:
+            i = 4 * (y * self._width + x)
+            self.data[i:i + 4] = bytes(rgb + (255,))
+
+    def putBlock(self, x, y, width, height, rgba):
+        # Copy a block of RGBA pixels with its top-left at (x,y)
+        x1, x2 = max(x, 0), min(x + width, self._width)
+        if x1 >= x2:
+            return
+        for row in range(max(y, 0), min(y + height, self._height)):
+            src = 4 * ((row - y) * width + x1 - x)
+            dst = 4 * (row * self._width + x1)
+            self.data[dst:dst + 4 * (x2 - x1)] = rgba[src:src + 4 * (x2 - x1)]
+
+    def rgb(self):
+        # All pixels as RGB bytes, row by row
+        rgb = bytearray(3 * self._width * self._height)
+        for channel in range(3):
+            rgb[channel::3] = self.data[channel::4]
+        return rgb
+
+    def copy(self):
+        other = Photo()
+        other._width, other._height, other.data = self._width, self._height, bytearray(self.data)
+        return other
+
+    def blank(self):
+        self.data = bytearray(len(self.data))
+
+    def write(self, filename, format=None):
+        writePNG(filename, self._width, self._height, self.data, alpha=True)
+
+
+class Item:
+    """One recorded canvas item"""
+
+    def __init__(self, kind, coords, options):
+        self.kind = kind
+        self.coords = list(coords)
+        self.options = options
+
+    def __repr__(self):
+        return "Item({!r}, {}, {})".format(self.kind, self.coords, self.options)
+
+
+def _splitTags(tags):
+    # The tags option as a tuple; Tk accepts one tag or a list of them
+    if not tags:
+        return ()
+    if isinstance(tags, str):
+        return tuple(tags.split())
+    return tuple(tags)
+
+
+class Scene:
+    """Records the items drawn on a headless window"""
+
+    def __init__(self, width, height, background="white"):
+        self.width = width
+        self.height = height
+        self.background = background
+        self.items = {}     # Item by id, in z order
+        self.nextId = 1
+        self.timings = {}   # operation -> [calls, total seconds]
+
+    @contextmanager
+    def timed(self, op):
+        """Context manager adding the time spent in the block to op"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = self.timings.setdefault(op, [0, 0.0])
+            entry[0] += 1
+            entry[1] += time.perf_counter() - start
+
+    def create(self, kind, coords, options):
+        """Add an item and return its id"""
+        id = self.nextId
+        self.nextId += 1
+        self.items[id] = Item(kind, coords, dict(options))
+        return id
+
+    def select(self, tagOrId):
+        """Return the ids of the item with this id, or of every item with
+        this tag"""
+        if tagOrId in self.items:
+            return [tagOrId]
+        return [id for id, item in self.items.items()
+                if tagOrId in _splitTags(item.options.get("tags"))]
+
+    def itemconfig(self, tagOrId, options):
+        for id in self.select(tagOrId):
+            self.items[id].options.update(options)
+
+    def raiseItems(self, tagOrId):
+        """Move the matching items to the top of the z order"""
+        for id in self.select(tagOrId):
+            self.items[id] = self.items.pop(id)
+
+    def coords(self, id, coords=None):
+        item = self.items[id]
+        if coords is not None:
+            item.coords = list(coords)
+        return list(item.coords)
+
+    def move(self, id, dx, dy):
+        item = self.items.get(id)
+        if item:
+            item.coords = [c + (dy if i % 2 else dx) for i, c in enumerate(item.coords)]
+
+    def delete(self, id):
+        self.items.pop(id, None)
+
+    def find(self, kind=None):
+        """Return the items of the given kind (all items if None)"""
+        return [item for item in self.items.values() if kind is None or item.kind == kind]
+
+    def render(self):
+        """Rasterize the scene and return a bytearray of RGB pixels"""
+        canvas = _Raster(self.width, self.height, parseColor(self.background) or (255, 255, 255))
+        for item in self.items.values():
+            if item.options.get("state") == "hidden":
+                continue
+            canvas.draw(item)
+        return canvas.pixels
+
+    def savePNG(self, filename):
+        """Rasterize the scene into a PNG file"""
+        writePNG(filename, self.width, self.height, self.render())
+
+
+class _Raster:
+    # Pure-Python rasterizer for scene items
+
+    def __init__(self, width, height, background):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(bytes(background) * (width * height))
+
+    def span(self, y, x1, x2, rgb):
+        # Fill pixels x1 <= x < x2 on row y
+        if rgb is None or not 0 <= y < self.height:
+            return
+        x1, x2 = max(int(x1), 0), min(int(x2), self.width)
+        if x2 > x1:
+            start = 3 * (y * self.width + x1)
+            self.pixels[start:start + 3 * (x2 - x1)] = bytes(rgb) * (x2 - x1)
+
+    def box(self, x1, y1, x2, y2, rgb):
+        for y in range(max(int(y1), 0), min(int(y2), self.height)):
+            self.span(y, x1, x2, rgb)
+
+    def draw(self, item):
+        options = item.options
+        fill = parseColor(options.get("fill", ""))
+        outline = parseColor(options.get("outline", ""))
+        width = max(1, int(float(options.get("width", 1) or 1)))
+        getattr(self, "_" + item.kind)(item.coords, fill, outline, width, options)
+
+    def _rectangle(self, coords, fill, outline, width, options):
+        x1, y1, x2, y2 = coords[:4]
+        x1, x2 = sorted((x1, x2))
+        y1, y2 = sorted((y1, y2))
+        self.box(x1, y1, x2 + 1, y2 + 1, fill)
+        if outline:
+            self.box(x1, y1, x2 + 1, y1 + width, outline)
+            self.box(x1, y2 + 1 - width, x2 + 1, y2 + 1, outline)
+            self.box(x1, y1, x1 + width, y2 + 1, outline)
+            self.box(x2 + 1 - width, y1, x2 + 1, y2 + 1, outline)
+
+    def _oval(self, coords, fill, outline, width, options):
+        x1, y1, x2, y2 = coords[:4]
+        x1, x2 = sorted((x1, x2))
+        y1, y2 = sorted((y1, y2))
+        cx, cy = (x1 + x2 + 1) / 2.0, (y1 + y2 + 1) / 2.0
+        rx, ry = (x2 - x1 + 1) / 2.0, (y2 - y1 + 1) / 2.0
+        for y in range(int(y1), int(y2) + 1):
+            dy = (y + 0.5 - cy) / ry
+            if abs(dy) > 1:
+                continue
+            half = rx * (1 - dy * dy) ** 0.5
+            self.span(y, cx - half + 0.5, cx + half + 0.5, fill)
+            if outline:
+                inner_rx, inner_ry = rx - width, ry - width
+                if inner_rx <= 0 or inner_ry <= 0 or abs(y + 0.5 - cy) >= inner_ry:
+                    self.span(y, cx - half + 0.5, cx + half + 0.5, outline)
+                else:
+                    idy = (y + 0.5 - cy) / inner_ry
+                    inner = inner_rx * (1 - idy * idy) ** 0.5
+                    self.span(y, cx - half + 0.5, cx - inner + 0.5, outline)
+                    self.span(y, cx + inner + 0.5, cx + half + 0.5, outline)
+
+    def _line(self, coords, fill, outline, width, options):
+        # Line colors are in the fill option; points are stamped as squares
+        for i in range(0, len(coords) - 2, 2):
+            x1, y1, x2, y2 = coords[i:i + 4]
+            steps = int(max(abs(x2 - x1), abs(y2 - y1))) or 1
+            for s in range(steps):
+                x = x1 + (x2 - x1) * s / float(steps)
+                y = y1 + (y2 - y1) * s / float(steps)
+                self.box(x - width // 2, y - width // 2, x - width // 2 + width,
+                         y - width // 2 + width, fill)
+
+    def _polygon(self, coords, fill, outline, width, options):
+        points = list(zip(coords[0::2], coords[1::2]))
+        if len(points) < 2:
+            return
+        ys = [p[1] for p in points]
+        for y in range(max(int(min(ys)), 0), min(int(max(ys)) + 1, self.height)):
+            yc = y + 0.5
+            xs = []
+            for (xa, ya), (xb, yb) in zip(points, points[1:] + points[:1]):
+                if (ya <= yc < yb) or (yb <= yc < ya):
+                    xs.append(xa + (yc - ya) * (xb - xa) / (yb - ya))
+            xs.sort()
+            for a, b in zip(xs[0::2], xs[1::2]):
+                self.span(y, a + 0.5, b + 0.5, fill)
+        if outline:
+            ring = coords + coords[:2]
+            self._line(ring, outline, None, width, options)
+
+    def _text(self, coords, fill, outline, width, options):
+        text = str(options.get("text", ""))
+        if not text or fill is None:
+            return
+        font = options.get("font", ("helvetica", 12, "normal"))
+        size = int(font[1]) if isinstance(font, (tuple, list)) else 12
+        cell = max(1, int(round(size / 6.0)))
+        cols = 4 * len(text) - 1
+        x0 = int(coords[0] - cols * cell / 2.0)
+        y0 = int(coords[1] - 5 * cell / 2.0)
+        for k, char in enumerate(text):
+            glyph = GLYPHS.get(char, GLYPHS.get(char.upper(), ("111", "101", "101", "101", "111")))
+            for r, line in enumerate(glyph):
+                for c, bit in enumerate(line):
+                    if bit == "1":
+                        x = x0 + (4 * k + c) * cell
+                        y = y0 + r * cell
+                        self.box(x, y, x + cell, y + cell, fill)
+
+    def _image(self, coords, fill, outline, width, options):
+        photo = options.get("image")
+        if not isinstance(photo, Photo):
+            return
+        w, h = photo.width(), photo.height()
+        if options.get("anchor") == "nw":
+            x0, y0 = int(coords[0]), int(coords[1])
+        else:
+            x0, y0 = int(coords[0] - w // 2), int(coords[1] - h // 2)
+        data = photo.data
+        for y in range(h):
+            if not 0 <= y0 + y < self.height:
+                continue
+            for x in range(w):
+                i = 4 * (y * w + x)
+                if data[i + 3] and 0 <= x0 + x < self.width:
+                    j = 3 * ((y0 + y) * self.width + x0 + x)
+                    self.pixels[j:j + 3] = data[i:i + 3]
+
+    def _window(self, coords, fill, outline, width, options):
+        pass  # embedded Tk widgets have no headless rendering
+
+
+def encodePNG(width, height, pixels, alpha=False):
+    """Return PNG file bytes for 8-bit RGB (or RGBA) pixel bytes"""
+    channels = 4 if alpha else 3
+    stride = channels * width
+    pixels = bytes(pixels)
+    raw = b"".join(b"\x00" + pixels[y * stride:(y + 1) * stride] for y in range(height))
+
+    def chunk(kind, body):
+        return (struct.pack(">I", len(body)) + kind + body
+                + struct.pack(">I", zlib.crc32(kind + body) & 0xFFFFFFFF))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6 if alpha else 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw, 1)) + chunk(b"IEND", b""))
+
+
+def writePNG(filename, width, height, pixels, alpha=False):
+    """Write 8-bit RGB (or RGBA) pixel bytes to a PNG file"""
+    with open(filename, "wb") as f:
+        f.write(encodePNG(width, height, pixels, alpha))
+
+
+def readPNG(filename):
+    """Read a PNG file; see decodePNG"""
+    with open(filename, "rb") as f:
+        return decodePNG(f.read())
+
+
+def decodePNG(data):
+    """Decode an 8-bit RGB or RGBA, non-interlaced PNG. Returns
+    (width, height, RGBA bytearray)"""
+    if data[:8] != b"\x89PNG\r\n\x1a\n":
+        raise ValueError("not PNG data")
+    pos, idat = 8, b""
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        if kind == b"IHDR":
+            width, height, depth, color, _, _, interlace = struct.unpack(">IIBBBBB", body)
+        elif kind == b"IDAT":
+            idat += body
+        pos += 12 + length
+    if depth != 8 or color not in (2, 6) or interlace:
+        raise ValueError("only 8-bit RGB/RGBA non-interlaced PNGs are supported")
+    channels = 4 if color == 6 else 3
+    stride = channels * width
+    raw = zlib.decompress(idat)
+    rows, prev = [], bytearray(stride)
+    for y in range(height):
+        kind = raw[y * (stride + 1)]
+        line = bytearray(raw[y * (stride + 1) + 1:(y + 1) * (stride + 1)])
+        for i in range(stride if kind else 0):
+            a = line[i - channels] if i >= channels else 0
+            b = prev[i]
+            c = prev[i - channels] if i >= channels else 0
+            if kind == 1:
+                line[i] = (line[i] + a) & 0xFF
+            elif kind == 2:
+                line[i] = (line[i] + b) & 0xFF
+            elif kind == 3:
+                line[i] = (line[i] + (a + b) // 2) & 0xFF
+            elif kind == 4:
+                p = a + b - c
+                pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                pred = a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+                line[i] = (line[i] + pred) & 0xFF
+        rows.append(line)
+        prev = line
+    if channels == 4:
+        return width, height, bytearray(b"".join(rows))
+    return width, height, _addAlpha(b"".join(rows))
+
+
+def decodePPM(data):
+    """Decode a binary (P6) PPM with 8-bit samples. Returns
+    (width, height, RGBA bytearray)"""
+    fields = data.split(None, 4)
+    if len(fields) < 4 or fields[0] != b"P6" or int(fields[3]) != 255:
+        raise ValueError("only 8-bit binary PPMs are supported")
+    width, height = int(fields[1]), int(fields[2])
+    pixels = data[len(data) - 3 * width * height:]
+    return width, height, _addAlpha(pixels)
+
+
+def _addAlpha(rgb):
+    # RGB bytes to opaque RGBA bytes
+    count = len(rgb) // 3
+    rgba = bytearray(b"\xff" * (4 * count))
+    for channel in range(3):
+        rgba[channel::4] = rgb[channel::3]
+    return rgba
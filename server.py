@@ -0,0 +1,273 @@
+"""Local HTTP/JSON roll service built on asyncio.start_server.
+
+    GET  /roll?dice=3&sides=6          {"dice": 3, "sides": 6, "faces": [...], "total": 11}
+    GET  /roll?expression=4d6kh3%2B2   {"expression": "4d6kh3+2", "total": 14}
+    POST /roll with the same fields as a JSON object
+
+Requests that arrive together are not rolled one by one. They are queued
+and, once per event loop tick, every request for the same pool or
+expression is rolled in a single vectorized call.
+
+Run with: python server.py [--host 127.0.0.1] [--port 8080]
+"""
+
+import argparse
+import asyncio
+import json
+import traceback
+from urllib.parse import parse_qsl, urlsplit
+
+import engine
+import notation
+
+try:  # NumPy lets a whole batch be rolled in one call
+    import numpy as np
+except ImportError:
+    np = None
+
+# Largest pool a single request may ask for; MAX_DICE also caps the dice
+# across all the pools of an expression
+MAX_DICE = 10000
+MAX_SIDES = 1000000
+MAX_POOLS = 100
+
+# Largest constant an expression may add or subtract
+MAX_MODIFIER = 1000000000
+
+# Largest request body accepted, in bytes, and most header lines
+MAX_BODY = 65536
+MAX_HEADERS = 100
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large",
+            500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    """Raised for a request that cannot be served. Carries the HTTP status"""
+
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+class RollBatcher:
+    """Collects roll requests and rolls each distinct pool or expression
+    once per event loop tick"""
+
+    def __init__(self, rng=None):
+        self.rng = rng
+        self.pending = {}
+        self.scheduled = False
+
+    def _submit(self, key):
+        # Queue a request and make sure a flush is scheduled for this tick
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.setdefault(key, []).append(future)
+        if not self.scheduled:
+            self.scheduled = True
+            loop.call_soon(self.flush)
+        return future
+
+    def roll(self, num_dice, sides):
+        """Return a future for the faces of one roll of the pool"""
+        return self._submit(("dice", num_dice, sides))
+
+    def roll_expression(self, plan):
+        """Return a future for the total of one roll of a notation.Plan"""
+        return self._submit(("expression", plan))
+
+    def flush(self):
+        """Roll everything queued so far and resolve the futures"""
+        pending, self.pending = self.pending, {}
+        self.scheduled = False
+        for key, futures in pending.items():
+            try:
+                results = self._roll_batch(key, len(futures))
+            except Exception as error:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for future, result in zip(futures, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _roll_batch(self, key, count):
+        # Roll count requests for one key with a single engine call
+        if key[0] == "dice":
+            _, num_dice, sides = key
+            if np is not None:
+                return engine.roll_array(count, num_dice, sides, self.rng).tolist()
+            return engine.roll_many(count, num_dice, sides, self.rng)
+        plan = key[1]
+        if np is not None:
+            return plan.roll_array(count, self.rng).tolist()
+        return plan.roll_many(count, self.rng)
+
+
+def _int_field(fields, name, low, high):
+    # Read an integer request field and check its range. Only JSON
+    # integers and strings of digits are accepted, not floats or booleans
+    try:
+        value = fields[name]
+    except KeyError:
+        raise RequestError(400, "missing field: " + name)
+    if isinstance(value, str) and value.isascii() and value.isdigit():
+        value = int(value)
+    elif type(value) is not int:
+        raise RequestError(400, "field must be an integer: " + name)
+    if not low <= value <= high:
+        raise RequestError(400, "{} must be between {} and {}".format(name, low, high))
+    return value
+
+
+async def handle_roll(batcher, fields):
+    """Serve one roll request given its fields and return the JSON reply"""
+    expression = fields.get("expression")
+    if expression is not None:
+        try:
+            plan = notation.parse(str(expression))
+        except notation.NotationError as error:
+            raise RequestError(400, str(error))
+        if len(plan.pools) > MAX_POOLS:
+            raise RequestError(400, "expression has too many pools")
+        if (sum(pool.count for _, pool in plan.pools) > MAX_DICE
+                or any(pool.sides > MAX_SIDES for _, pool in plan.pools)):
+            raise RequestError(400, "expression rolls too many dice")
+        if abs(plan.modifier) > MAX_MODIFIER:
+            raise RequestError(400, "expression modifier must be between {} and {}".format(
+                -MAX_MODIFIER, MAX_MODIFIER))
+        total = await batcher.roll_expression(plan)
+        return {"expression": str(plan), "total": total}
+    num_dice = _int_field(fields, "dice", 0, MAX_DICE)
+    sides = _int_field(fields, "sides", 1, MAX_SIDES)
+    faces = await batcher.roll(num_dice, sides)
+    return {"dice": num_dice, "sides": sides, "faces": faces, "total": sum(faces)}
+
+
+async def _read_line(reader):
+    # Read one line of the request head, refusing lines over the stream limit
+    try:
+        return await reader.readline()
+    except (asyncio.LimitOverrunError, ValueError):
+        raise RequestError(400, "request line too long")
+
+
+async def _read_request(reader):
+    # Parse one HTTP/1.x request. Returns None when the client hung up.
+    request_line = await _read_line(reader)
+    if not request_line.strip():
+        return None
+    try:
+        method, target, version = request_line.decode("latin-1").split()
+    except ValueError:
+        raise RequestError(400, "malformed request line")
+    headers = {}
+    for count in range(MAX_HEADERS + 1):
+        line = await _read_line(reader)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        if count == MAX_HEADERS:
+            raise RequestError(400, "too many header lines")
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise RequestError(400, "bad Content-Length")
+    if length < 0:
+        raise RequestError(400, "bad Content-Length")
+    if length > MAX_BODY:
+        raise RequestError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method, target, version, headers, body
+
+
+def _response(status, payload, keep_alive):
+    # Encode a JSON HTTP response
+    body = json.dumps(payload).encode()
+    head = ("HTTP/1.1 {} {}\r\n"
+            "Content-Type: application/json\r\n"
+            "Content-Length: {}\r\n"
+            "Connection: {}\r\n\r\n").format(status, _REASONS[status], len(body),
+                                             "keep-alive" if keep_alive else "close")
+    return head.encode() + body
+
+
+class RollServer:
+    """HTTP front end that routes /roll requests to a RollBatcher"""
+
+    def __init__(self, rng=None):
+        self.batcher = RollBatcher(rng)
+
+    async def _dispatch(self, method, target, body):
+        # Route one request and return its JSON reply
+        url = urlsplit(target)
+        if url.path != "/roll":
+            raise RequestError(404, "not found")
+        if method == "GET":
+            fields = dict(parse_qsl(url.query))
+        elif method == "POST":
+            try:
+                fields = json.loads(body or b"{}")
+            except ValueError:
+                raise RequestError(400, "body is not valid JSON")
+            if not isinstance(fields, dict):
+                raise RequestError(400, "body must be a JSON object")
+        else:
+            raise RequestError(405, "use GET or POST")
+        return await handle_roll(self.batcher, fields)
+
+    async def handle_client(self, reader, writer):
+        """Serve requests on one connection until the client closes it"""
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, target, version, headers, body = request
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = (connection == "keep-alive" if version == "HTTP/1.0"
+                                  else connection != "close")
+                    status, payload = 200, await self._dispatch(method, target, body)
+                except RequestError as error:
+                    status, payload = error.status, {"error": str(error)}
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    raise
+                except Exception:
+                    # answer rather than drop the connection, and log the bug
+                    traceback.print_exc()
+                    status, payload, keep_alive = 500, {"error": "internal error"}, False
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        """Listen on host:port until cancelled"""
+        server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local dice rolling service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    try:
+        asyncio.run(RollServer().serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Multiprocess Monte Carlo simulation of dice totals.
+
+simulate() splits the requested number of rolls into shards and runs them
+across a pool of processes. Each shard rolls with its own child of one
+NumPy SeedSequence and sends back only a fixed-size histogram of totals,
+so nothing proportional to the sample count crosses process boundaries.
+
+Shards are seeded by their position, not by the worker that runs them,
+so a seeded simulation gives the same histogram for any number of workers.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import engine
+import randomness
+
+try:  # NumPy does the rolling and counting
+    import numpy as np
+except ImportError:
+    np = None
+
+# Dice rolled by one shard, so shards take about the same time for any
+# pool size and a few million rolls already spread over several workers
+SHARD_DICE = 1 << 22
+
+
+def _shard(num_rolls, num_dice, sides, seed_sequence, algorithm):
+    # Roll one shard and return its histogram. Runs in a worker process.
+    source = randomness.NumpyRNG(seed_sequence, algorithm)
+    hist = np.zeros(num_dice * sides + 1, dtype=np.int64)
+    step = max(1, engine.CHUNK_DICE // max(num_dice, 1))
+    for start in range(0, num_rolls, step):
+        totals = engine.roll_totals_array(min(step, num_rolls - start), num_dice, sides, source)
+        hist += np.bincount(totals, minlength=len(hist))
+    return hist
+
+
+def simulate(num_rolls, num_dice, sides, workers=None, seed=None, algorithm="pcg64"):
+    """Roll num_dice dice num_rolls times and return a NumPy int64 array
+    hist where hist[t] is the number of rolls that totalled t.
+    workers defaults to the number of CPUs; 1 runs in this process"""
+    if np is None:
+        raise ImportError("simulate requires numpy")
+    if num_rolls < 0 or num_dice < 0:
+        raise ValueError("num_rolls and num_dice must be non-negative")
+    if sides < 1:
+        raise ValueError("sides must be at least 1")
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    shard_rolls = max(1, SHARD_DICE // max(num_dice, 1))
+    sizes = [min(shard_rolls, num_rolls - start) for start in range(0, num_rolls, shard_rolls)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    hist = np.zeros(num_dice * sides + 1, dtype=np.int64)
+    if workers == 1 or len(sizes) <= 1:
+        for size, seed_sequence in zip(sizes, seeds):
+            hist += _shard(size, num_dice, sides, seed_sequence, algorithm)
+        return hist
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as pool:
+        futures = [pool.submit(_shard, size, num_dice, sides, seed_sequence, algorithm)
+                   for size, seed_sequence in zip(sizes, seeds)]
+        for future in futures:
+            hist += future.result()
+    return hist
@@ -0,0 +1,78 @@
+"""Running statistics of roll totals.
+
+RollStats keeps the count, mean, variance, minimum, maximum and a count of
+every total seen, updating them in constant time per roll, so its cost
+does not grow with the number of rolls. Nothing is recomputed from
+history: the mean and variance use Welford's update, and batches of totals
+are merged with the pairwise form of the same formulas.
+"""
+
+from array import array
+
+try:  # NumPy lets a whole array of totals be added at once
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class RollStats:
+    """Running statistics of totals from 0 to max_total"""
+
+    def __init__(self, max_total):
+        self.max_total = max_total
+        self.counts = array("q", bytes(8 * (max_total + 1)))  # rolls per total
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0        # sum of squared differences from the mean
+        self.min = None
+        self.max = None
+
+    def _check(self, total):
+        if not 0 <= total <= self.max_total:
+            raise ValueError("total must be between 0 and {}".format(self.max_total))
+
+    def add(self, total):
+        """Add one roll total"""
+        self._check(total)
+        self.count += 1
+        delta = total - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (total - self.mean)
+        self.counts[total] += 1
+        if self.min is None or total < self.min:
+            self.min = total
+        if self.max is None or total > self.max:
+            self.max = total
+
+    def add_array(self, totals):
+        """Add a NumPy array of roll totals in one vectorized step"""
+        totals = np.asarray(totals)
+        n = len(totals)
+        if not n:
+            return
+        low, high = int(totals.min()), int(totals.max())
+        self._check(low)
+        self._check(high)
+        mean = float(totals.mean())
+        m2 = float(((totals - mean) ** 2).sum())
+        # merge the batch's mean and m2 with the running ones
+        count = self.count + n
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.count * n / count
+        self.mean += delta * n / count
+        self.count = count
+        hist = np.bincount(totals, minlength=self.max_total + 1)
+        view = np.frombuffer(self.counts, dtype=np.int64)
+        view += hist
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+
+    def variance(self):
+        """Sample variance of the totals, or 0.0 for fewer than two rolls"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def stdev(self):
+        return self.variance() ** 0.5
+
+    def reset(self):
+        self.__init__(self.max_total)
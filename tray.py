@@ -0,0 +1,131 @@
+from graphics import *
+from buttons import Button
+from die import DieView
+
+
+class DiceTray:
+    """A paged grid of dice that can hold any number of values.
+
+    Only one page of DieViews exists at a time. They are created the first
+    time a slot is needed and reused for every page, so a tray holding 60
+    dice costs no more canvas items than one holding a single page."""
+
+    def __init__(self, win, p1, p2, die_size, sprite=False):
+        """Create an empty tray
+        Parameters:
+            win: the GraphWin to draw on
+            p1, p2: opposite corners of the area the dice are laid out in
+            die_size: width and height of each die
+            sprite: passed on to each DieView
+        """
+        self.win = win
+        self.die_size = die_size
+        self.sprite = sprite
+        self.xmin, self.xmax = min(p1.getX(), p2.getX()), max(p1.getX(), p2.getX())
+        self.ymin, self.ymax = min(p1.getY(), p2.getY()), max(p1.getY(), p2.getY())
+
+        # fit as many dice as possible with a gap of a sixth of a die
+        gap = die_size / 6.0
+        self.pitch = die_size + gap
+        width, height = self.xmax - self.xmin, self.ymax - self.ymin
+        self.cols = max(1, int((width + gap) // self.pitch))
+        self.rows = max(1, int((height + gap) // self.pitch))
+        grid_w = self.cols * self.pitch - gap
+        grid_h = self.rows * self.pitch - gap
+        self.x0 = self.xmin + (width - grid_w) / 2.0 + die_size / 2.0
+        self.y0 = self.ymax - (height - grid_h) / 2.0 - die_size / 2.0
+
+        self.views = []        # DieViews for the visible slots, made on demand
+        self.values = []
+        self.page = 0
+        self.nav = None        # page controls, made when first needed
+
+    def perPage(self):
+        """Number of dice shown on one page"""
+        return self.cols * self.rows
+
+    def pages(self):
+        """Number of pages needed for the current values"""
+        return max(1, -(-len(self.values) // self.perPage()))
+
+    def setValues(self, values):
+        """Show a new list of die values, starting on the first page"""
+        self.values = list(values)
+        self.page = 0
+        self.__refresh()
+
+    def getValues(self):
+        return list(self.values)
+
+    def showPage(self, page):
+        """Show the given page, clamped to the pages that exist"""
+        self.page = max(0, min(page, self.pages() - 1))
+        self.__refresh()
+
+    def clicked(self, p):
+        """Return True if the click at p, as from getMouse, hit the page
+        controls. The page buttons have commands, so the window has
+        already turned the page"""
+        if not self.nav:
+            return False
+        prev_button, next_button, _ = self.nav
+        return prev_button.clicked(p) or next_button.clicked(p)
+
+    def __slotCenter(self, slot):
+        # Internal helper giving the centre of a grid slot
+        row, col = divmod(slot, self.cols)
+        return Point(self.x0 + col * self.pitch, self.y0 - row * self.pitch)
+
+    def __refresh(self):
+        # Recycle the slot views to show the current page
+        start = self.page * self.perPage()
+        visible = self.values[start:start + self.perPage()]
+        with self.win.batch():
+            while len(self.views) < len(visible):
+                view = DieView(self.win, self.__slotCenter(len(self.views)),
+                               self.die_size, self.sprite)
+                self.views.append(view)
+            for view, value in zip(self.views, visible):
+                view.show()
+                view.setValue(value)
+            for view in self.views[len(visible):]:
+                view.hide()
+            self.__updateNav()
+
+    def __updateNav(self):
+        # Show the page controls only when there is more than one page
+        paged = self.pages() > 1
+        if paged and not self.nav:
+            y = self.ymin - 0.35
+            prev_button = Button(self.win, Point(self.xmin + 0.3, y), 0.5, 0.4, "<",
+                                 lambda: self.showPage(self.page - 1))
+            next_button = Button(self.win, Point(self.xmax - 0.3, y), 0.5, 0.4, ">",
+                                 lambda: self.showPage(self.page + 1))
+            page_text = Text(Point((self.xmin + self.xmax) / 2.0, y), "")
+            page_text.setSize(10)
+            page_text.setTextColor("#DDDDDD")
+            page_text.draw(self.win)
+            self.nav = (prev_button, next_button, page_text)
+        if not self.nav:
+            return
+        prev_button, next_button, page_text = self.nav
+        for item in (prev_button.rect, prev_button.label,
+                     next_button.rect, next_button.label, page_text):
+            if paged and not item.canvas:
+                item.draw(self.win)
+            elif not paged:
+                item.undraw()
+        if paged:
+            page_text.setText("Page {} of {} ({} dice)".format(self.page + 1, self.pages(),
+                                                               len(self.values)))
+            if self.page > 0:
+                prev_button.activate()
+            else:
+                prev_button.deactivate()
+            if self.page < self.pages() - 1:
+                next_button.activate()
+            else:
+                next_button.deactivate()
+        else:
+            prev_button.deactivate()
+            next_button.deactivate()